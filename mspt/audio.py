@@ -1,26 +1,108 @@
 from __future__ import annotations
 
+import json
+import os
+import subprocess
+import tempfile
 import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from pydub import AudioSegment
+from pydub.utils import get_prober_name
 
+from mspt.audio_cache import DecodedPCM, load_pcm
 from mspt.io_utils import write_json
 from mspt.models import SourceEntry
 from mspt.paths import iter_audio_files
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module=r"pydub\.utils")
 
+# ffmpeg raw sample formats for pydub sample widths (pydub keeps 8-bit audio
+# signed and widens 24-bit audio to 32-bit on load).
+_RAW_FORMATS = {1: "s8", 2: "s16le", 4: "s32le"}
+
+# Codecs whose container duration is sample-exact, so probed durations can be
+# trusted as timings without decoding.
+_EXACT_DURATION_CODEC_PREFIXES = ("pcm_", "flac")
+# Only these containers can hold such codecs; anything else is never probed.
+_PROBE_SUFFIXES = frozenset({".wav", ".flac", ".aif", ".aiff"})
+
+
+@dataclass(frozen=True)
+class AudioProbe:
+    codec: str
+    sample_rate: int
+    channels: int
+    sample_fmt: str
+    # 0 when ffprobe does not report it.
+    bits_per_raw_sample: int
+    duration_ms: float
+
+
+def _conform(pcm: DecodedPCM, like: DecodedPCM) -> tuple[bytes | memoryview, int]:
+    """Return `pcm` samples in the format of `like`, and their length in ms."""
+    if (pcm.frame_rate, pcm.channels, pcm.sample_width) == (
+        like.frame_rate,
+        like.channels,
+        like.sample_width,
+    ):
+        return pcm.data, pcm.duration_ms
+    segment = (
+        pcm.to_segment()
+        .set_frame_rate(like.frame_rate)
+        .set_channels(like.channels)
+        .set_sample_width(like.sample_width)
+    )
+    return segment.raw_data, len(segment)
+
+
+def load_audio_files(files: Iterable[Path]) -> Iterator[DecodedPCM]:
+    """Decode `files` concurrently (via the PCM cache), yielding in input order.
+
+    Decoding is ffmpeg-bound (a child process per file), so a thread pool is
+    enough to keep every core busy. Only a small window of files is in flight
+    at once, which bounds memory and open cache mappings.
+    """
+    files = list(files)
+    if len(files) < 2:
+        yield from (load_pcm(p) for p in files)
+        return
+    workers = os.cpu_count() or 1
+    remaining = iter(files)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(
+            pool.submit(load_pcm, p) for p in islice(remaining, workers * 2)
+        )
+        while pending:
+            pcm = pending.popleft().result()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append(pool.submit(load_pcm, next_path))
+            yield pcm
+
 
 def concat_audio(files: Iterable[Path]) -> tuple[AudioSegment, list[SourceEntry]]:
-    combined = AudioSegment.empty()
+    # AudioSegment is immutable, so `combined += segment` would copy the whole
+    # buffer on every file. Assemble raw sample data in one growable buffer
+    # instead; each file's decoded data (or cache mapping) is released as soon
+    # as it has been appended.
+    files = list(files)
+    first: DecodedPCM | None = None
+    buf = bytearray()
     entries: list[SourceEntry] = []
     current_ms = 0.0
-    for file_path in files:
-        segment = AudioSegment.from_file(file_path)
+    for file_path, pcm in zip(files, load_audio_files(files)):
+        if first is None:
+            first = pcm
+        # The output format follows the first file.
+        data, duration_ms = _conform(pcm, first)
         start = current_ms
-        end = current_ms + len(segment)
+        end = current_ms + duration_ms
         entries.append(
             SourceEntry(
                 name=file_path.stem,
@@ -31,9 +113,224 @@ def concat_audio(files: Iterable[Path]) -> tuple[AudioSegment, list[SourceEntry]
                 timing=[(float(start), float(end))],
             )
         )
-        combined += segment
+        buf.extend(data)
+        current_ms = end
+    if first is None:
+        return AudioSegment.empty(), entries
+    return (
+        AudioSegment(
+            data=bytes(buf),
+            sample_width=first.sample_width,
+            frame_rate=first.frame_rate,
+            channels=first.channels,
+        ),
+        entries,
+    )
+
+
+def _sound(file_path: Path, start: float, end: float) -> dict:
+    """One sourcemap `sounds` item (docs format) for a concatenated file.
+
+    Times are rounded to microseconds, whichever encoder produced them.
+    """
+    return {
+        "name": file_path.stem,
+        # Virtual segment filename (what will be materialized at pack time).
+        # Preserve the original extension so user rules like `{0-3}.wav`
+        # continue to match.
+        "files": [{file_path.name: [round(float(start), 3), round(float(end), 3)]}],
+    }
+
+
+def _vorbis_command(input_args: list[str], ogg_path: Path) -> list[str]:
+    return [
+        AudioSegment.converter,
+        "-y",
+        "-hide_banner",
+        "-v",
+        "error",
+        *input_args,
+        "-c:a",
+        "libvorbis",
+        "-b:a",
+        "192k",
+        # Explicit muxer: the output may be a temporary name without `.ogg`.
+        "-f",
+        "ogg",
+        str(ogg_path),
+    ]
+
+
+def _ffmpeg_error(ogg_path: Path, returncode: int, stderr: str) -> RuntimeError:
+    message = f"ffmpeg failed to encode {ogg_path} (exit {returncode})"
+    tail = stderr.strip()[-2000:]
+    return RuntimeError(f"{message}: {tail}" if tail else message)
+
+
+def stream_encode_ogg(files: Iterable[Path], ogg_path: Path) -> list[dict]:
+    """Encode `files` back to back into `ogg_path` and return their timings.
+
+    Decoded PCM is piped straight into a single ffmpeg libvorbis encoder, so
+    the combined audio is never held in memory or written as a temporary WAV.
+    The output format follows the first file.
+
+    Timings are returned as sourcemap `sounds` items, ready to be written.
+    """
+
+    files = list(files)
+    decoded = load_audio_files(files)
+    first = next(decoded)
+    command = _vorbis_command(
+        [
+            "-f",
+            _RAW_FORMATS[first.sample_width],
+            "-ar",
+            str(first.frame_rate),
+            "-ac",
+            str(first.channels),
+            "-i",
+            "pipe:0",
+        ],
+        ogg_path,
+    )
+    sounds: list[dict] = []
+    current_ms = 0.0
+    # stderr goes to a file rather than a pipe, so a chatty ffmpeg can never
+    # block while we are still writing its stdin.
+    with tempfile.TemporaryFile() as stderr_fp:
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr_fp)
+        assert proc.stdin is not None
+        try:
+            for file_path, pcm in zip(files, chain([first], decoded)):
+                data, duration_ms = _conform(pcm, first)
+                end = current_ms + duration_ms
+                sounds.append(_sound(file_path, current_ms, end))
+                proc.stdin.write(data)
+                current_ms = end
+        except BrokenPipeError:
+            # ffmpeg exited early; its exit status is reported below.
+            pass
+        finally:
+            decoded.close()
+            proc.stdin.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            stderr_fp.seek(0)
+            stderr = stderr_fp.read().decode("utf-8", errors="replace")
+            raise _ffmpeg_error(ogg_path, returncode, stderr)
+    return sounds
+
+
+def _probe(file_path: Path) -> AudioProbe:
+    result = subprocess.run(
+        [
+            get_prober_name(),
+            "-v",
+            "error",
+            "-select_streams",
+            "a:0",
+            "-show_entries",
+            (
+                "stream=codec_name,sample_rate,channels,sample_fmt,"
+                "bits_per_raw_sample:format=duration"
+            ),
+            "-of",
+            "json",
+            str(file_path),
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    info = json.loads(result.stdout)
+    stream = info["streams"][0]
+    bits = str(stream.get("bits_per_raw_sample", ""))
+    return AudioProbe(
+        codec=str(stream["codec_name"]),
+        sample_rate=int(stream["sample_rate"]),
+        channels=int(stream["channels"]),
+        sample_fmt=str(stream.get("sample_fmt", "")),
+        bits_per_raw_sample=int(bits) if bits.isdigit() else 0,
+        duration_ms=float(info["format"]["duration"]) * 1000,
+    )
+
+
+def probe_audio_files(files: Iterable[Path]) -> list[AudioProbe] | None:
+    """Probe codec, format and duration of `files` with ffprobe, in parallel.
+
+    Returns None if any file cannot be probed.
+    """
+    files = list(files)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(_probe, files))
+    except (OSError, subprocess.CalledProcessError, KeyError, IndexError, ValueError):
+        return None
+
+
+def _format_of(probe: AudioProbe) -> tuple[str, int, int, str, int]:
+    return (
+        probe.codec,
+        probe.sample_rate,
+        probe.channels,
+        probe.sample_fmt,
+        probe.bits_per_raw_sample,
+    )
+
+
+def _has_exact_uniform_format(probes: list[AudioProbe]) -> bool:
+    """True if every file shares one sample-exact format, bit depth included."""
+    first = _format_of(probes[0])
+    return first[0].startswith(_EXACT_DURATION_CODEC_PREFIXES) and all(
+        _format_of(p) == first for p in probes
+    )
+
+
+def _concat_list_line(file_path: Path) -> str:
+    # ffconcat quoting: close the quote, emit an escaped quote, reopen.
+    quoted = file_path.resolve().as_posix().replace("'", "'\\''")
+    return f"file '{quoted}'\n"
+
+
+def concat_encode_ogg(
+    files: Iterable[Path], probes: list[AudioProbe], ogg_path: Path
+) -> list[dict]:
+    """Encode `files` into `ogg_path` in one ffmpeg run via the concat demuxer.
+
+    No audio passes through Python; timings come from `probes`. Only valid
+    when all files share one format with sample-exact durations, which is
+    also what the concat demuxer requires.
+    """
+
+    files = list(files)
+    sounds: list[dict] = []
+    current_ms = 0.0
+    for file_path, probe in zip(files, probes):
+        end = current_ms + probe.duration_ms
+        sounds.append(_sound(file_path, current_ms, end))
         current_ms = end
-    return combined, entries
+
+    list_fd, list_name = tempfile.mkstemp(
+        prefix="concat-", suffix=".txt", dir=ogg_path.parent
+    )
+    list_path = Path(list_name)
+    try:
+        with os.fdopen(list_fd, "w", encoding="utf-8") as fp:
+            fp.writelines(_concat_list_line(p) for p in files)
+        result = subprocess.run(
+            _vorbis_command(
+                ["-f", "concat", "-safe", "0", "-i", str(list_path)], ogg_path
+            ),
+            capture_output=True,
+            check=False,
+            text=True,
+            errors="replace",
+        )
+    finally:
+        list_path.unlink(missing_ok=True)
+    if result.returncode != 0:
+        raise _ffmpeg_error(ogg_path, result.returncode, result.stderr)
+    return sounds
 
 
 def generate_sourcemap(source_dir: Path, target_dir: Path) -> Path:
@@ -42,22 +339,28 @@ def generate_sourcemap(source_dir: Path, target_dir: Path) -> Path:
         raise ValueError(f"No audio files found in {source_dir}")
 
     target_dir.mkdir(parents=True, exist_ok=True)
-    combined, entries = concat_audio(audio_files)
     ogg_path = target_dir / "sound.ogg"
-    combined.export(ogg_path, format="ogg", codec="libvorbis", bitrate="192k")
+    # Encode to a temporary file and move it into place, so a failed or
+    # interrupted build never leaves a truncated sound.ogg behind.
+    tmp_path = ogg_path.with_name(f".{ogg_path.name}.tmp")
+    try:
+        probes = None
+        if all(p.suffix.lower() in _PROBE_SUFFIXES for p in audio_files):
+            probes = probe_audio_files(audio_files)
+        if probes is not None and _has_exact_uniform_format(probes):
+            sounds = concat_encode_ogg(audio_files, probes, tmp_path)
+        else:
+            sounds = stream_encode_ogg(audio_files, tmp_path)
+        os.replace(tmp_path, ogg_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     # Docs format: a list of virtual sounds, each mapping to one or more
     # concrete files with a time selection in sound.ogg.
     sourcemap = {
         "audio_file": ogg_path.name,
         "source_dir": str(source_dir),
-        "sounds": [
-            {
-                "name": entry.name,
-                "files": [{entry.file: [t[0], t[1]]} for t in entry.timing],
-            }
-            for entry in entries
-        ],
+        "sounds": sounds,
     }
     sourcemap_path = target_dir / "sourcemap.json"
     write_json(sourcemap_path, sourcemap)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import mmap
+import os
+from dataclasses import dataclass
+from hashlib import blake2b
+from pathlib import Path
+
+from pydub import AudioSegment
+
+from mspt.io_utils import read_json, write_json
+
+CACHE_DIR_NAME = ".mspt_cache"
+
+
+@dataclass(frozen=True)
+class DecodedPCM:
+    """Raw samples of one decoded source file, in pydub's sample layout."""
+
+    data: bytes | memoryview
+    frame_rate: int
+    channels: int
+    sample_width: int
+    duration_ms: int
+
+    def to_segment(self) -> AudioSegment:
+        return AudioSegment(
+            data=bytes(self.data),
+            sample_width=self.sample_width,
+            frame_rate=self.frame_rate,
+            channels=self.channels,
+        )
+
+
+def _source_id(path: Path) -> str:
+    return blake2b(path.resolve().as_posix().encode()).hexdigest()[:16]
+
+
+def cache_key(path: Path) -> str:
+    """Key a source file as `<source id>-<version>`.
+
+    The source id hashes the resolved path; the version hashes mtime and size.
+    Editing or replacing the file changes the key, so stale entries are never
+    read back, and the shared source id lets them be pruned.
+    """
+
+    st = path.stat()
+    version = blake2b(str(st.st_mtime_ns).encode() + str(st.st_size).encode())
+    return f"{_source_id(path)}-{version.hexdigest()[:16]}"
+
+
+def _map_readonly(pcm_path: Path) -> bytes | memoryview:
+    with pcm_path.open("rb") as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            # mmap cannot map an empty file.
+            return b""
+        return memoryview(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _read_cached(pcm_path: Path, meta_path: Path) -> DecodedPCM | None:
+    """Return the cached entry, or None if it is missing or unreadable."""
+
+    try:
+        meta = read_json(meta_path)
+        pcm = DecodedPCM(
+            data=_map_readonly(pcm_path),
+            frame_rate=int(meta["frame_rate"]),
+            channels=int(meta["channels"]),
+            sample_width=int(meta["sample_width"]),
+            duration_ms=int(meta["duration_ms"]),
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    frame_width = pcm.channels * pcm.sample_width
+    if frame_width <= 0 or len(pcm.data) % frame_width:
+        return None
+    return pcm
+
+
+def _write_cached(cache_dir: Path, key: str, pcm: DecodedPCM) -> None:
+    """Store `pcm` under `key` and drop older entries for the same source.
+
+    Both files go through a temporary name and `os.replace`, samples first, so
+    an interrupted write never leaves an entry that reads back as a hit.
+    """
+
+    pcm_path = cache_dir / f"{key}.pcm"
+    meta_path = cache_dir / f"{key}.json"
+    cache_dir.mkdir(exist_ok=True)
+    tmp_path = pcm_path.with_suffix(".pcm.tmp")
+    tmp_path.write_bytes(pcm.data)
+    os.replace(tmp_path, pcm_path)
+    tmp_meta_path = meta_path.with_suffix(".json.tmp")
+    write_json(
+        tmp_meta_path,
+        {
+            "frame_rate": pcm.frame_rate,
+            "channels": pcm.channels,
+            "sample_width": pcm.sample_width,
+            "duration_ms": pcm.duration_ms,
+        },
+        compact=True,
+    )
+    os.replace(tmp_meta_path, meta_path)
+
+    keep = {pcm_path.name, meta_path.name}
+    source_id = key.partition("-")[0]
+    for stale in cache_dir.glob(f"{source_id}-*"):
+        if stale.name not in keep:
+            stale.unlink(missing_ok=True)
+
+
+def load_pcm(path: Path) -> DecodedPCM:
+    """Return decoded PCM for `path`, decoding through ffmpeg only on a miss.
+
+    Decoded samples are cached beside the source under `.mspt_cache/<key>.pcm`
+    with their format in `<key>.json`; warm entries are memory-mapped. The
+    cache is best-effort: an unwritable directory or a damaged entry only
+    costs a fresh decode.
+    """
+
+    cache_dir = path.parent / CACHE_DIR_NAME
+    key = cache_key(path)
+    cached = _read_cached(cache_dir / f"{key}.pcm", cache_dir / f"{key}.json")
+    if cached is not None:
+        return cached
+
+    segment = AudioSegment.from_file(path)
+    pcm = DecodedPCM(
+        data=segment.raw_data,
+        frame_rate=segment.frame_rate,
+        channels=segment.channels,
+        sample_width=segment.sample_width,
+        duration_ms=len(segment),
+    )
+    try:
+        _write_cached(cache_dir, key, pcm)
+    except OSError:
+        pass
+    return pcm
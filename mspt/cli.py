@@ -3,15 +3,17 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from pydantic import ValidationError
-
-from mspt.audio import generate_sourcemap
-from mspt.config import generate_config, parse_schema_selector
-from mspt.pack import pack_target
+from mspt.io_utils import read_json
 from mspt.paths import resolve_pack_dir, resolve_sourcemap_path, resolve_target_dir
+from mspt.selector import parse_schema_selector
+
+# Audio and config modules pull in pydub/pydantic, so they are imported inside
+# the commands that need them to keep `--help` and argument errors fast.
 
 
 def run_prepare(input_dir: Path) -> Path:
+    from mspt.audio import generate_sourcemap
+
     target_dir = resolve_target_dir(input_dir)
     return generate_sourcemap(input_dir, target_dir)
 
@@ -20,22 +22,39 @@ def run_build(
     input_path: Path,
     split: bool,
     rule_path: Path | None,
-    schema: str,
+    schemas: set[str],
     dx_compatible: bool,
-) -> tuple[Path, dict[str, Path]]:
+) -> tuple[Path, dict[str, Path], dict]:
+    """Generate configs; also returns the parsed sourcemap for packing."""
+    from mspt.config import generate_config
+
     sourcemap_path = resolve_sourcemap_path(input_path)
     target_dir = sourcemap_path.parent
-    if not sourcemap_path.exists():
-        raise FileNotFoundError(f"sourcemap.json not found at {sourcemap_path}")
+    try:
+        sourcemap = read_json(sourcemap_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"sourcemap.json not found at {sourcemap_path}"
+        ) from None
     config_paths = generate_config(
-        sourcemap_path,
+        sourcemap,
         target_dir,
         split=split,
         rule_path=rule_path,
-        schema=schema,
+        schemas=schemas,
         dx_compatible=dx_compatible,
     )
-    return target_dir, config_paths
+    return target_dir, config_paths, sourcemap
+
+
+def run_pack(
+    target_dir: Path, schemas: set[str], sourcemap: dict | None = None
+) -> None:
+    from mspt.pack import pack_target
+
+    for s in sorted(schemas):
+        zip_path = pack_target(target_dir, config_variant=s, sourcemap=sourcemap)
+        print(f"Pack complete: {zip_path}")
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -114,19 +133,23 @@ def main() -> int:
         parser.error("the following arguments are required: -i/--input")
     input_path = Path(args.input)
     rule_path = Path(args.rule) if args.rule else None
-    # Validate schema selector early (so argparse shows a clean error)
-    parse_schema_selector(args.schema)
+    # Parse the schema selector once, early (so argparse shows a clean error)
+    try:
+        schemas = parse_schema_selector(args.schema)
+    except ValueError as exc:
+        parser.error(str(exc))
+        return 1
 
     try:
         if args.command == "prepare":
             sourcemap_path = run_prepare(input_path)
             print(f"Prepare complete: {sourcemap_path}")
         elif args.command == "build":
-            target_dir, config_paths = run_build(
+            target_dir, config_paths, sourcemap = run_build(
                 input_path,
                 split=args.split,
                 rule_path=rule_path,
-                schema=args.schema,
+                schemas=schemas,
                 dx_compatible=args.dx_compatible,
             )
             print(
@@ -134,24 +157,18 @@ def main() -> int:
                 + ", ".join(f"{k}={v}" for k, v in sorted(config_paths.items()))
             )
             if args.release:
-                schemas = sorted(parse_schema_selector(args.schema))
-                for s in schemas:
-                    zip_path = pack_target(target_dir, config_variant=s)
-                    print(f"Pack complete: {zip_path}")
+                run_pack(target_dir, schemas, sourcemap=sourcemap)
         elif args.command == "pack":
             target_dir = resolve_pack_dir(input_path)
-            schemas = sorted(parse_schema_selector(args.schema))
-            for s in schemas:
-                zip_path = pack_target(target_dir, config_variant=s)
-                print(f"Pack complete: {zip_path}")
+            run_pack(target_dir, schemas)
         else:
             sourcemap_path = run_prepare(input_path)
             print(f"Prepare complete: {sourcemap_path}")
-            target_dir, config_paths = run_build(
+            target_dir, config_paths, sourcemap = run_build(
                 sourcemap_path,
                 split=args.split,
                 rule_path=rule_path,
-                schema=args.schema,
+                schemas=schemas,
                 dx_compatible=args.dx_compatible,
             )
             print(
@@ -159,11 +176,9 @@ def main() -> int:
                 + ", ".join(f"{k}={v}" for k, v in sorted(config_paths.items()))
             )
             if args.release:
-                schemas = sorted(parse_schema_selector(args.schema))
-                for s in schemas:
-                    zip_path = pack_target(target_dir, config_variant=s)
-                    print(f"Pack complete: {zip_path}")
-    except (ValidationError, ValueError, FileNotFoundError) as exc:
+                run_pack(target_dir, schemas, sourcemap=sourcemap)
+    # pydantic's ValidationError is a ValueError subclass.
+    except (ValueError, FileNotFoundError) as exc:
         parser.error(str(exc))
         return 1
 
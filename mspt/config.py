@@ -2,51 +2,69 @@ from __future__ import annotations
 
 import json
 import re
-import shutil
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from importlib import resources
 from pathlib import Path
 from typing import cast
 
-from mspt.converters import build_mechvibes_v2_inputs, to_mechvibes_v1, to_mechvibes_v2
-from mspt.io_utils import deep_merge, read_json, write_json
+from mspt.converters import (
+    MechvibesV2Inputs,
+    build_mechvibes_v2_inputs,
+    to_mechvibes_v1,
+    to_mechvibes_v2,
+)
+from mspt.io_utils import deep_merge, link_or_copy, read_json, write_json
 from mspt.paths import find_icon_file, find_license_file
 from mspt.rules import build_definitions, load_rule
 from mspt.schema.mechvibes_v2 import MechvibesV2Schema
 from mspt.schema.mvdx import DefinitionKey, KeyName, MVDXSchema
+from mspt.selector import parse_schema_selector
 
+_COMMON_PATH = Path("rule") / "common.json"
 
-def parse_schema_selector(selector: str) -> set[str]:
-    """Parse a schema selector string.
+_WS_RE = re.compile(r"\s+")
+_SEP_RE = re.compile(r"[-_]+")
 
-    - "v1|v2" selects both
-    - "all" is a special value meaning "v1|v2|mvdx"
+
+@lru_cache(maxsize=4)
+def _read_common(path_str: str, mtime_ns: int) -> dict:
+    return read_json(Path(path_str))
+
+
+@lru_cache(maxsize=1)
+def _load_packaged_common() -> dict | None:
+    try:
+        packaged_common = resources.files("rule") / "common.json"
+        if packaged_common.is_file():
+            return json.loads(packaged_common.read_text(encoding="utf-8"))
+    except ModuleNotFoundError:
+        pass
+    return None
+
+
+def _load_common() -> dict | None:
+    """Return `rule/common.json` from the CWD if present, else the packaged one.
+
+    Cached for the process lifetime (per mtime for the on-disk file); the
+    returned dict is shared and must not be mutated.
     """
 
-    raw = (selector or "").strip().lower()
-    if not raw:
-        raise ValueError("schema selector is empty")
-    if raw == "all":
-        return {"v1", "v2", "mvdx"}
-    parts = [p.strip() for p in raw.split("|") if p.strip()]
-    allowed = {"v1", "v2", "mvdx"}
-    unknown = [p for p in parts if p not in allowed]
-    if unknown:
-        raise ValueError(
-            "Invalid --schema value(s): "
-            + ", ".join(sorted(set(unknown)))
-            + ". Use v1|v2|mvdx or all."
+    if _COMMON_PATH.exists():
+        return _read_common(
+            str(_COMMON_PATH.resolve()), _COMMON_PATH.stat().st_mtime_ns
         )
-    return set(parts)
+    return _load_packaged_common()
 
 
 def to_id(raw_name: str) -> str:
-    normalized = re.sub(r"\s+", "-", raw_name.strip())
+    normalized = _WS_RE.sub("-", raw_name.strip())
     return normalized.lower()
 
 
 def to_title(raw_name: str) -> str:
-    cleaned = re.sub(r"[-_]+", " ", raw_name.strip())
+    cleaned = _SEP_RE.sub(" ", raw_name.strip())
     return " ".join(part.capitalize() for part in cleaned.split())
 
 
@@ -96,116 +114,181 @@ def split_definitions(definitions: dict[str, dict], split: bool) -> dict[str, di
 
 
 def to_definition_keys(definitions: dict[str, dict]) -> dict[KeyName, DefinitionKey]:
+    # Timings are checked and coerced here, so the models are built with
+    # `model_construct` instead of paying pydantic validation per key.
     out: dict[KeyName, DefinitionKey] = {}
     for key, value in definitions.items():
         timing = value.get("timing", [])
-        pairs: list[tuple[float, float]] = []
         for pair in timing:
             if not isinstance(pair, (list, tuple)) or len(pair) != 2:
                 raise ValueError(f"Invalid timing pair for key '{key}': {pair}")
-            pairs.append((float(pair[0]), float(pair[1])))
-        out[cast(KeyName, key)] = DefinitionKey(timing=pairs)
+        if not 1 <= len(timing) <= 2:
+            raise ValueError(
+                f"Invalid timing for key '{key}': expected 1-2 pairs, got {len(timing)}"
+            )
+        pairs = [(float(start), float(end)) for start, end in timing]
+        out[cast(KeyName, key)] = DefinitionKey.model_construct(timing=pairs)
     return out
 
 
+@dataclass(frozen=True)
+class ConfigBundle:
+    """Structures derived once from sourcemap + rule, shared by all emitters."""
+
+    mvdx: MVDXSchema
+    # Only built when the v2 schema is requested.
+    v2_inputs: MechvibesV2Inputs | None
+
+
+def build_bundle(
+    sourcemap: dict,
+    *,
+    raw_name: str,
+    rule: dict | None,
+    split: bool,
+    icon_name: str | None,
+    wanted: set[str],
+    created_at: str,
+) -> ConfigBundle:
+    definitions = build_definitions(sourcemap, rule=rule)
+
+    # MVDX optionally supports 2 timing pairs per key, which we currently use as
+    # a simple keydown/keyup split when requested. V1 is unaffected by the
+    # split: it merges a down/up pair back into one clip spanning both halves.
+    definitions_typed = to_definition_keys(split_definitions(definitions, split))
+
+    # Every field is already sanitized (definitions by `to_definition_keys`).
+    mvdx = MVDXSchema.model_construct(
+        audio_file=str(sourcemap.get("audio_file", "sound.ogg")),
+        config_version="2",
+        created_at=created_at,
+        id=to_id(raw_name),
+        name=to_title(raw_name),
+        icon=icon_name,
+        definitions=definitions_typed,
+    )
+
+    v2_inputs = None
+    if "v2" in wanted:
+        # For Mechvibes V2, definitions are file-based; allow _UP rules and
+        # treat --split as requesting key-up behavior (multi only in v2).
+        v2_inputs = build_mechvibes_v2_inputs(
+            sourcemap=sourcemap, rule=rule, split=split
+        )
+    return ConfigBundle(mvdx=mvdx, v2_inputs=v2_inputs)
+
+
+def _overlay_common(config: dict, common: dict) -> dict:
+    """Apply common.json over a freshly dumped `config`, in place.
+
+    Same result as `deep_merge(config, common)` (common.json wins), without
+    copying the top level of `config`; only dicts present on both sides (in
+    practice `options`) are merged recursively.
+    """
+
+    for key, value in common.items():
+        current = config.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            config[key] = deep_merge(current, value)
+        else:
+            config[key] = value
+    return config
+
+
+def emit_mvdx(bundle: ConfigBundle, target_dir: Path) -> Path:
+    config = bundle.mvdx.model_dump(exclude_none=True)
+    common = _load_common()
+    if common is not None:
+        config = _overlay_common(config, common)
+
+    config = reorder_config(config)
+    mvdx_path = target_dir / "config.mvdx.json"
+    write_json(mvdx_path, config, compact=True)
+    return mvdx_path
+
+
+def emit_v1(bundle: ConfigBundle, target_dir: Path, *, dx_compatible: bool) -> Path:
+    # V1 is single-audio + timestamp-based.
+    v1_model = to_mechvibes_v1(mvdx=bundle.mvdx, dx_compatible=dx_compatible)
+    v1_path = target_dir / "config.v1.json"
+    write_json(v1_path, v1_model.model_dump(exclude_none=True), compact=True)
+    return v1_path
+
+
+def emit_v2(bundle: ConfigBundle, target_dir: Path, *, dx_compatible: bool) -> Path:
+    v2_inputs = bundle.v2_inputs
+    if v2_inputs is None:
+        raise ValueError("v2 inputs were not built for this bundle")
+    mvdx = bundle.mvdx
+    v2_model: MechvibesV2Schema = to_mechvibes_v2(
+        id=mvdx.id,
+        name=mvdx.name,
+        author=mvdx.author,
+        icon=mvdx.icon,
+        tags=list(mvdx.tags),
+        sound=v2_inputs.sound,
+        soundup=v2_inputs.soundup,
+        keydown_defines=v2_inputs.keydown_defines,
+        keyup_defines=v2_inputs.keyup_defines,
+        all_keys=v2_inputs.keydown_defines.keys()
+        if v2_inputs.has_keyup_rules
+        else None,
+        fill_missing_up=v2_inputs.has_keyup_rules,
+        dx_compatible=dx_compatible,
+    )
+    v2_path = target_dir / "config.v2.json"
+    write_json(v2_path, v2_model.model_dump(exclude_none=True), compact=True)
+    return v2_path
+
+
 def generate_config(
-    sourcemap_path: Path,
+    sourcemap: dict | Path,
     target_dir: Path,
     split: bool,
     rule_path: Path | None,
     schema: str = "v1|v2",
     dx_compatible: bool = False,
+    schemas: set[str] | None = None,
 ) -> dict[str, Path]:
-    sourcemap = read_json(sourcemap_path)
+    """Write the requested config variants into `target_dir`.
+
+    `sourcemap` is the path to `sourcemap.json`, or its already-parsed
+    contents. `schemas` is an already-parsed selector (see
+    `parse_schema_selector`); when given, `schema` is ignored.
+    """
+
+    # One timestamp for every variant emitted by this build.
+    created_at = datetime.now(timezone.utc).isoformat()
+    if isinstance(sourcemap, Path):
+        sourcemap = read_json(sourcemap)
     source_dir = Path(sourcemap.get("source_dir", target_dir))
     rule = load_rule(rule_path)
+    wanted = schemas if schemas is not None else parse_schema_selector(schema)
 
     icon_file = find_icon_file(source_dir)
     if icon_file is not None:
-        shutil.copy2(icon_file, target_dir / icon_file.name)
+        link_or_copy(icon_file, target_dir / icon_file.name)
         icon_name = icon_file.name
     else:
         icon_name = None
 
-    definitions = build_definitions(sourcemap, rule=rule)
-    definitions_typed = to_definition_keys(definitions)
-
-    raw_name = target_dir.name
-    mvdx_model_base = MVDXSchema(
-        audio_file=str(sourcemap.get("audio_file", "sound.ogg")),
-        config_version="2",
-        created_at=datetime.now(timezone.utc).isoformat(),
-        id=to_id(raw_name),
-        name=to_title(raw_name),
-        icon=icon_name,
-        definitions=definitions_typed,
+    bundle = build_bundle(
+        sourcemap,
+        raw_name=target_dir.name,
+        rule=rule,
+        split=split,
+        icon_name=icon_name,
+        wanted=wanted,
+        created_at=created_at,
     )
 
-    # MVDX optionally supports 2 timing pairs per key, which we currently use as
-    # a simple keydown/keyup split when requested.
-    mvdx_model = mvdx_model_base
-    if split:
-        split_defs = split_definitions(definitions, split=True)
-        mvdx_model = mvdx_model_base.model_copy(
-            update={"definitions": to_definition_keys(split_defs)}
-        )
-
     outputs: dict[str, Path] = {}
-    wanted = parse_schema_selector(schema)
-
     if "mvdx" in wanted:
-        config = mvdx_model.model_dump(exclude_none=True)
-        common_path = Path("rule") / "common.json"
-        if common_path.exists():
-            config = deep_merge(config, read_json(common_path))
-        else:
-            try:
-                packaged_common = resources.files("rule") / "common.json"
-                if packaged_common.is_file():
-                    packaged_data = json.loads(
-                        packaged_common.read_text(encoding="utf-8")
-                    )
-                    config = deep_merge(config, packaged_data)
-            except ModuleNotFoundError:
-                pass
-
-        config = reorder_config(config)
-        mvdx_path = target_dir / "config.mvdx.json"
-        write_json(mvdx_path, config)
-        outputs["mvdx"] = mvdx_path
-
+        outputs["mvdx"] = emit_mvdx(bundle, target_dir)
     if "v1" in wanted:
-        # V1 is single-audio + timestamp-based.
-        v1_model = to_mechvibes_v1(mvdx=mvdx_model_base, dx_compatible=dx_compatible)
-        v1_path = target_dir / "config.v1.json"
-        write_json(v1_path, v1_model.model_dump(exclude_none=True))
-        outputs["v1"] = v1_path
-
+        outputs["v1"] = emit_v1(bundle, target_dir, dx_compatible=dx_compatible)
     if "v2" in wanted:
-        # For Mechvibes V2, definitions are file-based; allow _UP rules and
-        # treat --split as requesting key-up behavior (multi only in v2).
-        v2_inputs = build_mechvibes_v2_inputs(
-            sourcemap=sourcemap, rule=rule, split=split
-        )
-        v2_model: MechvibesV2Schema = to_mechvibes_v2(
-            id=mvdx_model_base.id,
-            name=mvdx_model_base.name,
-            author=mvdx_model_base.author,
-            icon=mvdx_model_base.icon,
-            tags=list(mvdx_model_base.tags),
-            sound=v2_inputs.sound,
-            soundup=v2_inputs.soundup,
-            keydown_defines=v2_inputs.keydown_defines,
-            keyup_defines=v2_inputs.keyup_defines,
-            all_keys=v2_inputs.keydown_defines.keys()
-            if v2_inputs.has_keyup_rules
-            else None,
-            fill_missing_up=v2_inputs.has_keyup_rules,
-            dx_compatible=dx_compatible,
-        )
-        v2_path = target_dir / "config.v2.json"
-        write_json(v2_path, v2_model.model_dump(exclude_none=True))
-        outputs["v2"] = v2_path
+        outputs["v2"] = emit_v2(bundle, target_dir, dx_compatible=dx_compatible)
 
     # Note: we intentionally do not copy source audio files into target.
     # Packing should source audio from sourcemap/source_dir (and generate split
@@ -213,6 +296,6 @@ def generate_config(
 
     license_file = find_license_file(source_dir)
     if license_file is not None:
-        shutil.copy2(license_file, target_dir / license_file.name)
+        link_or_copy(license_file, target_dir / license_file.name)
 
     return outputs
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
+from itertools import cycle
 from typing import Iterable, cast, get_args
 
 from mspt.keycodes import keyname_to_keycode
@@ -15,6 +17,16 @@ from mspt.schema.mechvibes_v2 import MechvibesV2Schema
 from mspt.schema.mvdx import DefinitionKey, KeyName, MVDXSchema
 from mspt.sourcemap import iter_sourcemap_entries
 
+# Key tables used by the per-key loops below.
+_VALID_KEYNAMES: frozenset[str] = frozenset(get_args(KeyName))
+_KEYNAME_BY_LOWER: dict[str, KeyName] = {
+    k.lower(): cast(KeyName, k) for k in _VALID_KEYNAMES
+}
+_KEYCODE_STR: dict[str, str] = {
+    k: str(keyname_to_keycode(cast(KeyName, k))) for k in _VALID_KEYNAMES
+}
+_KEYCODE_UP_STR: dict[str, str] = {k: f"{v}-up" for k, v in _KEYCODE_STR.items()}
+
 
 @dataclass(frozen=True)
 class KeyTimings:
@@ -41,14 +53,13 @@ def _with_suffix(filename_or_pattern: str, suffix: str) -> str:
 
     if not filename_or_pattern:
         return filename_or_pattern
-    if filename_or_pattern.endswith(f"{suffix}.ogg") or filename_or_pattern.endswith(
-        f"{suffix}.wav"
-    ):
-        return filename_or_pattern
-    dot = filename_or_pattern.rfind(".")
-    if dot == -1:
+    parts = filename_or_pattern.rsplit(".", 1)
+    if len(parts) == 1:
         return f"{filename_or_pattern}{suffix}"
-    return f"{filename_or_pattern[:dot]}{suffix}{filename_or_pattern[dot:]}"
+    stem, ext = parts
+    if ext in ("ogg", "wav") and stem.endswith(suffix):
+        return filename_or_pattern
+    return f"{stem}{suffix}.{ext}"
 
 
 def _timing_pair_to_clip(pair: tuple[float, float]) -> list[int]:
@@ -64,10 +75,8 @@ def mvdx_definitions_to_keytimings(
     definitions: dict[KeyName, DefinitionKey] | dict[str, dict],
 ) -> dict[KeyName, KeyTimings]:
     out: dict[KeyName, KeyTimings] = {}
-    valid_keys = set(get_args(KeyName))
     for key, value in definitions.items():
-        key_name = cast(KeyName, key) if key in valid_keys else None
-        if key_name is None:
+        if key not in _VALID_KEYNAMES:
             continue
 
         # accept either typed model objects or raw dicts
@@ -76,16 +85,20 @@ def mvdx_definitions_to_keytimings(
         else:
             timing = value.timing
 
-        pairs: list[tuple[float, float]] = []
         for raw_pair in timing:
             if len(raw_pair) != 2:
                 raise ValueError(
-                    f"Invalid timing pair for key '{key_name}': expected 2 items, got {len(raw_pair)}"
+                    f"Invalid timing pair for key '{key}': expected 2 items, got {len(raw_pair)}"
                 )
-            pairs.append((float(raw_pair[0]), float(raw_pair[1])))
-        down = pairs[0] if len(pairs) >= 1 else None
-        up = pairs[1] if len(pairs) >= 2 else None
-        out[key_name] = KeyTimings(down=down, up=up)
+        # Only the first two pairs (down, up) are used; unpack them directly.
+        down = up = None
+        if timing:
+            start, end = timing[0]
+            down = (float(start), float(end))
+            if len(timing) >= 2:
+                start, end = timing[1]
+                up = (float(start), float(end))
+        out[cast(KeyName, key)] = KeyTimings(down=down, up=up)
     return out
 
 
@@ -107,11 +120,9 @@ def to_mechvibes_v1(
             down_start, _down_end = timing.down
             _up_start, up_end = timing.up
             combined = (float(down_start), float(up_end))
-            keycode = str(keyname_to_keycode(key))
-            defines[keycode] = _timing_pair_to_clip(combined)
+            defines[_KEYCODE_STR[key]] = _timing_pair_to_clip(combined)
             continue
-        keycode = str(keyname_to_keycode(key))
-        defines[keycode] = _timing_pair_to_clip(timing.down)
+        defines[_KEYCODE_STR[key]] = _timing_pair_to_clip(timing.down)
 
     return MechvibesV1Schema(
         id=mvdx.id,
@@ -151,14 +162,14 @@ def to_mechvibes_v2(
     defines: dict[str, str] = {}
 
     for key, filename in keydown_defines.items():
-        defines[str(keyname_to_keycode(key))] = filename
+        defines[_KEYCODE_STR[key]] = filename
 
     for key, filename in keyup_defines.items():
-        defines[f"{keyname_to_keycode(key)}-up"] = filename
+        defines[_KEYCODE_UP_STR[key]] = filename
 
     if fill_missing_up:
         for key in _all_keynames(all_keys):
-            up_key = f"{keyname_to_keycode(key)}-up"
+            up_key = _KEYCODE_UP_STR[key]
             if up_key not in defines:
                 defines[up_key] = soundup
 
@@ -176,6 +187,49 @@ def to_mechvibes_v2(
     )
 
 
+# Patterns that may not be wrapped in a shared alternation: brace ranges (glob
+# matched), group syntax such as inline flags or named groups, and backrefs
+# whose numbering would shift.
+_UNCOMBINABLE_RE = re.compile(r"\{\d+-\d+\}|\(\?|\\\d")
+
+
+def _first_match_indices(patterns: list[str], files: list[str]) -> list[int | None]:
+    """Return, per file, the index of the first pattern matching it.
+
+    Equivalent to trying `compile_matcher(p)` for each pattern in order, but
+    done with one combined regex pass where every pattern is a plain regex.
+    """
+
+    combined = None
+    if patterns and not any(_UNCOMBINABLE_RE.search(p) for p in patterns):
+        try:
+            for p in patterns:
+                re.compile(p)
+            # `[\s\S]*?` lets each alternative match anywhere (like search()),
+            # while match() at position 0 tries the alternatives in rule order.
+            combined = re.compile(
+                "|".join(
+                    f"(?P<p{i}>[\\s\\S]*?(?:{p}))" for i, p in enumerate(patterns)
+                ),
+                re.IGNORECASE,
+            )
+        except re.error:
+            combined = None
+
+    if combined is None:
+        matchers = [compile_matcher(p) for p in patterns]
+        return [
+            next((i for i, matcher in enumerate(matchers) if matcher(f)), None)
+            for f in files
+        ]
+
+    out: list[int | None] = []
+    for f in files:
+        m = combined.match(f)
+        out.append(int(m.lastgroup[1:]) if m and m.lastgroup else None)
+    return out
+
+
 def build_mechvibes_v2_inputs(
     *,
     sourcemap: dict,
@@ -192,12 +246,8 @@ def build_mechvibes_v2_inputs(
 
     key_names = load_key_names()
     keys: list[KeyName] = [k for k in key_names]  # type: ignore[assignment]
-    key_name_set = {k.lower() for k in keys}
 
-    entries = [
-        {"name": entry.name, "file": entry.file}
-        for entry in iter_sourcemap_entries(sourcemap)
-    ]
+    entries = iter_sourcemap_entries(sourcemap)
     if not entries:
         raise ValueError("No entries found in sourcemap.json")
 
@@ -218,11 +268,27 @@ def build_mechvibes_v2_inputs(
     enable_keyup = False
 
     if rule_map and isinstance(rule_map, dict):
+        # Each entry is claimed by the first rule pattern that matches it.
+        rule_patterns = [
+            pattern
+            for pattern, selectors in rule_map.items()
+            if not (pattern == "fallback" and isinstance(selectors, str))
+        ]
+        claimed_by = _first_match_indices(
+            rule_patterns, [entry.file for entry in entries]
+        )
+        matched_patterns = {i for i in claimed_by if i is not None}
+        for idx, i in enumerate(claimed_by):
+            if i is not None:
+                used_indices.add(idx)
+
+        pattern_index = -1
         for pattern, selectors in rule_map.items():
             if pattern == "fallback" and isinstance(selectors, str):
                 # legacy alias support
                 fallback_down = fallback_down or selectors
                 continue
+            pattern_index += 1
 
             selector_list = to_list(selectors)
             has_fallback_down = "*" in selector_list
@@ -241,16 +307,7 @@ def build_mechvibes_v2_inputs(
                 else:
                     down_selectors.append(sel)
 
-            matcher = compile_matcher(pattern)
-            matched_any = False
-            for idx, entry in enumerate(entries):
-                if idx in used_indices:
-                    continue
-                if matcher(entry["file"]):
-                    matched_any = True
-                    used_indices.add(idx)
-
-            if matched_any:
+            if pattern_index in matched_patterns:
                 if has_fallback_down and fallback_down is None:
                     fallback_down = pattern
                     fallback_down_from_rule = True
@@ -275,7 +332,7 @@ def build_mechvibes_v2_inputs(
 
     # Fallback sounds if not explicitly provided by rule
     if fallback_down is None:
-        fallback_down = str(entries[0]["file"])
+        fallback_down = str(entries[0].file)
     if fallback_up is None:
         fallback_up = fallback_down
 
@@ -292,38 +349,39 @@ def build_mechvibes_v2_inputs(
     # 3) Fill remaining keys:
     #    - if rule has '*' fallback: use that fallback file
     #    - else: cycle through the remaining (non-reserved, non-rule-matched) files
+    #
+    # Both the direct match and the reservation go through one lowercase
+    # name -> KeyName lookup; entries keep their order, so the first entry
+    # named after a key wins.
     for idx, entry in enumerate(entries):
-        name = entry.get("name", "")
+        name = str(entry.name or "")
         if not name:
             continue
-        for k in keys:
-            if k in keydown_defines:
-                continue
-            if k.lower() == name.lower():
-                keydown_defines[k] = entry["file"]
-                break
-
-    # Reserve any key-named files from auto distribution unless the user
-    # explicitly assigns them via rule patterns.
-    for idx, entry in enumerate(entries):
-        name = str(entry.get("name", "") or "")
-        if name and name.lower() in key_name_set:
-            used_indices.add(idx)
+        k = _KEYNAME_BY_LOWER.get(name.lower())
+        if k is None:
+            continue
+        if k not in keydown_defines:
+            keydown_defines[k] = entry.file
+        # Reserve key-named files from auto distribution unless the user
+        # explicitly assigns them via rule patterns.
+        used_indices.add(idx)
 
     remaining_entries = [
         entry for idx, entry in enumerate(entries) if idx not in used_indices
     ]
-    cycle_files = [str(entry["file"]) for entry in remaining_entries] or [fallback_down]
-
-    for i, k in enumerate(keys):
-        if k in keydown_defines:
-            continue
-        # If the user provided a fallback rule ('*'), keep behavior stable: use
-        # that fallback file for all unspecified keys.
-        if fallback_down_from_rule:
-            keydown_defines[k] = fallback_down
-        else:
-            keydown_defines[k] = cycle_files[i % len(cycle_files)]
+    cycle_files = [str(entry.file) for entry in remaining_entries] or [fallback_down]
+
+    # If the user provided a fallback rule ('*'), keep behavior stable: use
+    # that fallback file for all unspecified keys. Otherwise key `i` (by
+    # position among all keys, filled or not) gets `cycle_files[i % n]`.
+    if fallback_down_from_rule:
+        keydown_defines.update(
+            dict.fromkeys((k for k in keys if k not in keydown_defines), fallback_down)
+        )
+    else:
+        for k, filename in zip(keys, cycle(cycle_files)):
+            if k not in keydown_defines:
+                keydown_defines[k] = filename
 
     # In split mode, derive key-up filenames from each key's down filename
     # unless the rule explicitly assigned an up mapping.
@@ -1,129 +1,145 @@
 from __future__ import annotations
 
 import json
+import os
+import re
+import shutil
 from pathlib import Path
 
+# orjson is optional; when installed it is used for strict JSON reads/writes.
+try:
+    import orjson  # type: ignore
+except ModuleNotFoundError:
+    orjson = None
+
+# Linux ioctl for reflink copies (btrfs, xfs, ...): _IOW(0x94, 9, int).
+_FICLONE = 0x40049409
+
+
+# One scanner for the JSON5 subset we accept: string literals are kept as-is,
+# comments are dropped, and a comma is dropped when only whitespace/comments
+# separate it from a closing `}` or `]`. Unterminated strings and block
+# comments run to the end of the text.
+_JSON5_COMMENT = r"//[^\n\r]*(?![^\n\r])|/\*(?:[^*]|\*(?!/))*(?:\*/|\Z)"
+_JSON5_SCAN = re.compile(
+    r"(?P<string>"
+    r'"(?:\\[\s\S]|[^"\\])*(?:"|\\?\Z)'
+    r"|'(?:\\[\s\S]|[^'\\])*(?:'|\\?\Z)"
+    r")"
+    rf"|{_JSON5_COMMENT}"
+    rf"|,(?=(?:[ \t\n\r]|{_JSON5_COMMENT})*[\]}}])"
+)
+
+
+def _strip_json5(text: str) -> str:
+    """Strip // and /* */ comments and trailing commas, preserving strings."""
+
+    return _JSON5_SCAN.sub(lambda m: m.group("string") or "", text)
+
+
+def write_json(path: Path, data: dict, *, compact: bool = False) -> None:
+    """Write `data` as UTF-8 JSON.
+
+    Output is indented for humans by default; `compact=True` drops all
+    insignificant whitespace (for files only machines read).
+    """
+
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        path.write_bytes(orjson.dumps(data, option=option))
+        return
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    path.write_bytes(text.encode("utf-8"))
+
+
+def read_json_str(text: str) -> dict:
+    """Parse JSON text, accepting the JSON5 subset rule files use."""
+
+    # Strict JSON (everything write_json produces) is parsed directly; only
+    # commented / JSON5-style text (e.g. rule files) takes the slower path.
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    else:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
 
-def _strip_json5_comments(text: str) -> str:
-    """Strip // and /* */ comments while preserving string literals."""
-
-    out: list[str] = []
-    i = 0
-    in_string = False
-    string_quote = ""
-    escape = False
-
-    while i < len(text):
-        ch = text[i]
-
-        if in_string:
-            out.append(ch)
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == string_quote:
-                in_string = False
-                string_quote = ""
-            i += 1
-            continue
-
-        if ch in ('"', "'"):
-            in_string = True
-            string_quote = ch
-            out.append(ch)
-            i += 1
-            continue
-
-        # Line comment
-        if ch == "/" and i + 1 < len(text) and text[i + 1] == "/":
-            i += 2
-            while i < len(text) and text[i] not in ("\n", "\r"):
-                i += 1
-            continue
-
-        # Block comment
-        if ch == "/" and i + 1 < len(text) and text[i + 1] == "*":
-            i += 2
-            while i + 1 < len(text) and not (text[i] == "*" and text[i + 1] == "/"):
-                i += 1
-            i += 2 if i + 1 < len(text) else 0
-            continue
-
-        out.append(ch)
-        i += 1
-
-    return "".join(out)
+    # Prefer json5 if installed (full JSON5 support), otherwise do best-effort
+    # comment + trailing comma stripping.
+    try:
+        import json5  # type: ignore
 
+        return json5.loads(text)
+    except ModuleNotFoundError:
+        cleaned = _strip_json5(text)
+        return json.loads(cleaned)
 
-def _strip_trailing_commas(text: str) -> str:
-    """Remove trailing commas before } or ] (common in JSON5-style files)."""
 
-    out: list[str] = []
-    i = 0
-    in_string = False
-    string_quote = ""
-    escape = False
+def read_json(path: Path) -> dict:
+    return read_json_str(path.read_text(encoding="utf-8"))
 
-    while i < len(text):
-        ch = text[i]
 
-        if in_string:
-            out.append(ch)
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == string_quote:
-                in_string = False
-                string_quote = ""
-            i += 1
-            continue
+def deep_merge(base: dict, override: dict) -> dict:
+    """Return `override` merged over `base` (nested dicts merged recursively).
 
-        if ch in ('"', "'"):
-            in_string = True
-            string_quote = ch
-            out.append(ch)
-            i += 1
-            continue
+    Copy-on-write: `base` is only copied once a key actually changes, and
+    whatever `override` leaves untouched (possibly `base` itself) is shared
+    with the result rather than copied. Neither input is modified.
+    """
 
-        if ch == ",":
-            j = i + 1
-            while j < len(text) and text[j] in (" ", "\t", "\n", "\r"):
-                j += 1
-            if j < len(text) and text[j] in ("]", "}"):
-                i += 1
+    result: dict | None = None
+    for key, value in override.items():
+        current = base.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            value = deep_merge(current, value)
+            if value is current:
                 continue
-
-        out.append(ch)
-        i += 1
-
-    return "".join(out)
+        elif key in base and current is value:
+            continue
+        if result is None:
+            result = dict(base)
+        result[key] = value
+    return base if result is None else result
 
 
-def write_json(path: Path, data: dict) -> None:
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Place `src` at `dst`, sharing data blocks where the filesystem allows.
 
+    Tries a hardlink, then a reflink (FICLONE), then falls back to
+    `shutil.copy2`. An existing `dst` is replaced.
+    """
 
-def read_json(path: Path) -> dict:
-    raw = path.read_text(encoding="utf-8")
+    if dst.exists():
+        if dst.samefile(src):
+            return
+        dst.unlink()
 
-    # Prefer json5 if installed (full JSON5 support), otherwise do best-effort
-    # comment + trailing comma stripping.
     try:
-        import json5  # type: ignore
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
 
-        return json5.loads(raw)
+    try:
+        import fcntl
     except ModuleNotFoundError:
-        cleaned = _strip_trailing_commas(_strip_json5_comments(raw))
-        return json.loads(cleaned)
-
-
-def deep_merge(base: dict, override: dict) -> dict:
-    result = dict(base)
-    for key, value in override.items():
-        if isinstance(value, dict) and isinstance(result.get(key), dict):
-            result[key] = deep_merge(result[key], value)
-        else:
-            result[key] = value
-    return result
+        fcntl = None
+    if fcntl is not None:
+        try:
+            with src.open("rb") as src_fp, dst.open("wb") as dst_fp:
+                fcntl.ioctl(dst_fp.fileno(), _FICLONE, src_fp.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            dst.unlink(missing_ok=True)
+
+    shutil.copy2(src, dst)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Final
 
-from mspt.schema.mvdx import KeyName
+from mspt.keys import KeyName
 
 # Keycodes are the "standard" keycodes used by Mechvibes (uiohook-style),
 # as documented by the upstream project.
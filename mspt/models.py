@@ -1,10 +1,22 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SourceEntry:
+    """One named timing segment from a sourcemap.
+
+    Slotted and frozen: fields cannot be reassigned, but `timing` is still a
+    list, so callers must copy it rather than mutate it in place.
+    """
+
     name: str
     file: str
     timing: list[tuple[float, float]]
+    # Lowercased `name`, computed once for the case-insensitive key lookups.
+    name_lower: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        lowered = self.name.lower() if isinstance(self.name, str) else ""
+        object.__setattr__(self, "name_lower", lowered)
@@ -1,15 +1,48 @@
 from __future__ import annotations
 
 import io
+import os
+import shutil
 import zipfile
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
 from pathlib import Path
-
-from pydub import AudioSegment
+from typing import TYPE_CHECKING
 
 from mspt.io_utils import read_json
+from mspt.paths import AUDIO_EXTENSIONS
 from mspt.rules import compile_matcher
 from mspt.sourcemap import iter_sourcemap_entries
 
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+# Already-compressed audio gains nothing from deflate; store it as-is.
+_STORED_SUFFIXES = frozenset(AUDIO_EXTENSIONS - {".wav", ".aiff", ".aif"})
+
+
+# Build inputs/intermediates that never ship in a pack; config.json is
+# replaced by the selected variant.
+_SKIP_NAMES = frozenset({"sourcemap.json", "config.json"})
+
+_COPY_CHUNK = 1024 * 1024
+
+
+def _compress_type(filename: str) -> int:
+    if Path(filename).suffix.lower() in _STORED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _write_file(archive: zipfile.ZipFile, file_path: Path, arcname: str) -> None:
+    """Like `archive.write`, but copies in 1 MiB chunks (zipfile uses 8 KiB)."""
+
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    zinfo.compress_type = _compress_type(file_path.name)
+    with file_path.open("rb") as src, archive.open(zinfo, "w") as dst:
+        shutil.copyfileobj(src, dst, _COPY_CHUNK)
+
 
 def _is_derived_variant(filename: str) -> tuple[str, str] | None:
     """Return (base_filename, variant) for derived segment names.
@@ -19,15 +52,17 @@ def _is_derived_variant(filename: str) -> tuple[str, str] | None:
     - "X-down.ogg" -> ("X.ogg", "down")
     """
 
-    p = Path(filename)
-    suffix = p.suffix
-    stem = p.stem
+    # Same stem/suffix split as `Path(filename)`, without building a Path.
+    name = filename.rpartition("/")[2]
+    dot = name.rfind(".")
+    if 0 < dot < len(name) - 1:
+        stem, suffix = name[:dot], name[dot:]
+    else:
+        stem, suffix = name, ""
     if stem.endswith("-up"):
-        base = f"{stem[:-3]}{suffix}"
-        return base, "up"
+        return f"{stem[:-3]}{suffix}", "up"
     if stem.endswith("-down"):
-        base = f"{stem[:-5]}{suffix}"
-        return base, "down"
+        return f"{stem[:-5]}{suffix}", "down"
     return None
 
 
@@ -44,20 +79,74 @@ def _split_pairs(
     return out
 
 
-def _materialize_v2_assets(*, target_dir: Path, config: dict) -> dict[str, bytes]:
+def _clipper(segment: AudioSegment) -> Callable[[int, int], bytes]:
+    """Return `clip(start, end)`: the bytes of `segment[start:end]` (ms).
+
+    Slices the raw data directly (same clamping, frame rounding and end
+    padding as pydub) instead of building an AudioSegment per clip.
+    Sourcemaps may repeat the same segment across files, so each pair is
+    sliced once.
+    """
+
+    raw = segment.raw_data
+    frame_width = segment.frame_width
+    frames_per_ms = segment.frame_rate / 1000.0
+    length_ms = len(segment)
+
+    @cache
+    def clip(start: int, end: int) -> bytes:
+        positions = []
+        for ms in (start, end):
+            ms = min(ms, length_ms)
+            if ms < 0:
+                ms = length_ms + ms
+            positions.append(int(ms * frames_per_ms) * frame_width)
+        lo, hi = positions
+        data = raw[lo:hi]
+        # Like pydub, pad a rounding shortfall at the very end with silence.
+        missing = hi - lo - len(data)
+        if data and missing > 0:
+            data += b"\0" * missing
+        return data
+
+    return clip
+
+
+def _encode_clip(task: tuple[bytes, int, int, int, bool]) -> bytes:
+    """Encode raw PCM to wav or ogg; module-level so worker processes can run it."""
+
+    from pydub import AudioSegment
+
+    data, frame_rate, sample_width, channels, as_wav = task
+    segment = AudioSegment(
+        data=data, sample_width=sample_width, frame_rate=frame_rate, channels=channels
+    )
+    buf = io.BytesIO()
+    if as_wav:
+        segment.export(buf, format="wav")
+    else:
+        # Default to ogg to avoid ogg->wav roundtrip without quality gain.
+        segment.export(buf, format="ogg", codec="libvorbis", bitrate="192k")
+    return buf.getvalue()
+
+
+def _materialize_v2_assets(
+    *, target_dir: Path, config: dict, sourcemap: dict | None = None
+) -> dict[str, bytes]:
     """Generate audio assets needed by a Mechvibes V2 config.
 
-    This reads `sourcemap.json` and slices `audio_file` (typically `sound.ogg`)
-    into concrete audio files referenced by the v2 config (including pattern/
-    brace-range matches).
+    This reads `sourcemap.json` (unless an already-parsed `sourcemap` is
+    given) and slices `audio_file` (typically `sound.ogg`) into concrete audio
+    files referenced by the v2 config (including pattern/brace-range matches).
     """
 
-    sourcemap_path = target_dir / "sourcemap.json"
-    if not sourcemap_path.exists():
-        raise FileNotFoundError(
-            f"sourcemap.json not found at {sourcemap_path} (run prepare first)"
-        )
-    sourcemap = read_json(sourcemap_path)
+    if sourcemap is None:
+        sourcemap_path = target_dir / "sourcemap.json"
+        if not sourcemap_path.exists():
+            raise FileNotFoundError(
+                f"sourcemap.json not found at {sourcemap_path} (run prepare first)"
+            )
+        sourcemap = read_json(sourcemap_path)
 
     audio_file = str(sourcemap.get("audio_file", "sound.ogg") or "sound.ogg")
     audio_path = target_dir / audio_file
@@ -72,24 +161,36 @@ def _materialize_v2_assets(*, target_dir: Path, config: dict) -> dict[str, bytes
             continue
         file_to_timings.setdefault(entry.file, []).extend(entry.timing)
 
-    available_files = list(file_to_timings.keys())
+    available_files = tuple(file_to_timings)
     if not available_files:
         raise ValueError("No files found in sourcemap.json")
 
-    required_patterns: set[str] = set()
+    # Most defines repeat a handful of patterns; dedupe them in config order
+    # so each distinct pattern is resolved once, deterministically.
+    required_patterns: dict[str, None] = {}
     for key in ("sound", "soundup"):
         value = config.get(key)
         if isinstance(value, str) and value:
-            required_patterns.add(value)
+            required_patterns[value] = None
 
     defines = config.get("defines", {})
     if isinstance(defines, dict):
         for value in defines.values():
             if isinstance(value, str) and value:
-                required_patterns.add(value)
+                required_patterns[value] = None
+
+    # A base pattern is shared by its -up/-down variants and often by a direct
+    # reference too; scan the sourcemap files once per distinct pattern.
+    match_cache: dict[str, list[str]] = {}
+
+    def find_matches(pattern: str) -> list[str]:
+        if pattern not in match_cache:
+            matcher = compile_matcher(pattern)
+            match_cache[pattern] = [name for name in available_files if matcher(name)]
+        return match_cache[pattern]
 
     needed_files: set[str] = set()
-    for pattern in sorted(required_patterns):
+    for pattern in required_patterns:
         derived = _is_derived_variant(pattern)
         if derived is not None:
             base_pattern, variant = derived
@@ -97,8 +198,7 @@ def _materialize_v2_assets(*, target_dir: Path, config: dict) -> dict[str, bytes
                 needed_files.add(pattern)
                 continue
 
-            matcher = compile_matcher(base_pattern)
-            base_matches = [name for name in available_files if matcher(name)]
+            base_matches = find_matches(base_pattern)
             if not base_matches:
                 if (target_dir / pattern).exists():
                     continue
@@ -115,8 +215,7 @@ def _materialize_v2_assets(*, target_dir: Path, config: dict) -> dict[str, bytes
             needed_files.add(pattern)
             continue
 
-        matcher = compile_matcher(pattern)
-        matches = [name for name in available_files if matcher(name)]
+        matches = find_matches(pattern)
         if not matches:
             # Allow packs that provide real files in target_dir.
             if (target_dir / pattern).exists():
@@ -129,8 +228,17 @@ def _materialize_v2_assets(*, target_dir: Path, config: dict) -> dict[str, bytes
     if not needed_files:
         return {}
 
+    # Imported lazily: only v2 packs slice audio.
+    from pydub import AudioSegment
+
     combined = AudioSegment.from_file(audio_path)
-    out: dict[str, bytes] = {}
+    clip = _clipper(combined)
+
+    # Several outputs can cut the exact same clips (e.g. a pattern and an
+    # alias of it); encode each distinct clip list once per format.
+    output_keys: dict[str, tuple] = {}
+    pcm_cache: dict[tuple, bytes] = {}
+    tasks: dict[tuple, tuple[bytes, int, int, int, bool]] = {}
     for filename in sorted(needed_files):
         timings = file_to_timings.get(filename)
         if not timings:
@@ -143,22 +251,51 @@ def _materialize_v2_assets(*, target_dir: Path, config: dict) -> dict[str, bytes
                 continue
             timings = _split_pairs(base_timings, variant=variant)
 
-        segment = AudioSegment.empty()
-        for start, end in timings:
-            segment += combined[int(round(start)) : int(round(end))]
+        clips = tuple((int(round(start)), int(round(end))) for start, end in timings)
+        key = (clips, Path(filename).suffix.lower() == ".wav")
+        output_keys[filename] = key
+        if key not in tasks:
+            pcm = pcm_cache.get(clips)
+            if pcm is None:
+                pcm = pcm_cache[clips] = b"".join(clip(*pair) for pair in clips)
+            tasks[key] = (
+                pcm,
+                combined.frame_rate,
+                combined.sample_width,
+                combined.channels,
+                key[1],
+            )
 
-        buf = io.BytesIO()
-        suffix = Path(filename).suffix.lower()
-        if suffix == ".wav":
-            segment.export(buf, format="wav")
-        else:
-            # Default to ogg to avoid ogg->wav roundtrip without quality gain.
-            segment.export(buf, format="ogg", codec="libvorbis", bitrate="192k")
-        out[filename] = buf.getvalue()
-    return out
+    keys = list(tasks)
+    if len(keys) >= 4 and os.environ.get("MSPT_PARALLEL_ENCODE") == "1":
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            encoded = list(
+                pool.map(
+                    _encode_clip,
+                    [tasks[key] for key in keys],
+                    chunksize=max(1, len(keys) // (workers * 4)),
+                )
+            )
+    else:
+        encoded = [_encode_clip(tasks[key]) for key in keys]
 
+    by_key = dict(zip(keys, encoded))
+    return {filename: by_key[key] for filename, key in output_keys.items()}
+
+
+def pack_target(
+    target_dir: Path,
+    config_variant: str | None = None,
+    *,
+    sourcemap: dict | None = None,
+) -> Path:
+    """Zip `target_dir` for `config_variant`.
+
+    `sourcemap` may be passed when the caller already parsed
+    `sourcemap.json` (e.g. right after a build) to avoid re-reading it.
+    """
 
-def pack_target(target_dir: Path, config_variant: str | None = None) -> Path:
     if not target_dir.exists():
         raise FileNotFoundError(f"target dir not found at {target_dir}")
 
@@ -176,34 +313,36 @@ def pack_target(target_dir: Path, config_variant: str | None = None) -> Path:
     v2_assets: dict[str, bytes] = {}
     if config_variant == "v2" and variant_path is not None:
         config = read_json(variant_path)
-        v2_assets = _materialize_v2_assets(target_dir=target_dir, config=config)
+        v2_assets = _materialize_v2_assets(
+            target_dir=target_dir, config=config, sourcemap=sourcemap
+        )
 
+    is_v2 = config_variant == "v2"
+
+    def skip(name: str) -> bool:
+        if name in _SKIP_NAMES:
+            return True
+        if name.startswith("config.") and name.endswith(".json"):
+            return True
+        # V2 is file-based: sound.ogg is only an intermediate slicing source,
+        # and materialized assets take precedence over files on disk.
+        return is_v2 and (name == "sound.ogg" or name in v2_assets)
+
+    prefix = target_dir.name
     with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
-        for file_path in sorted(target_dir.rglob("*")):
-            if not file_path.is_file():
-                continue
-            if file_path.name == "sourcemap.json":
-                continue
-            if file_path.name == "config.json":
-                continue
-            if config_variant == "v2" and file_path.name == "sound.ogg":
-                # V2 is file-based; sound.ogg is only an intermediate slicing source.
-                continue
-            if file_path.name.startswith("config.") and file_path.name.endswith(
-                ".json"
-            ):
-                continue
-            if config_variant == "v2" and file_path.name in v2_assets:
-                # Prefer the materialized version from sourcemap.
-                continue
-            arcname = (
-                f"{target_dir.name}/{file_path.relative_to(target_dir).as_posix()}"
-            )
-            archive.write(file_path, arcname=arcname)
+        for file_path in sorted(
+            p for p in target_dir.rglob("*") if not skip(p.name) and p.is_file()
+        ):
+            arcname = f"{prefix}/{file_path.relative_to(target_dir).as_posix()}"
+            _write_file(archive, file_path, arcname)
 
         for filename, data in sorted(v2_assets.items()):
-            archive.writestr(f"{target_dir.name}/{filename}", data)
+            archive.writestr(
+                f"{prefix}/{filename}",
+                data,
+                compress_type=_compress_type(filename),
+            )
 
         if variant_path is not None:
-            archive.write(variant_path, arcname=f"{target_dir.name}/config.json")
+            archive.write(variant_path, arcname=f"{prefix}/config.json")
     return zip_path
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 
 AUDIO_EXTENSIONS = {
@@ -17,26 +18,45 @@ AUDIO_EXTENSIONS = {
 IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
 
 
+@lru_cache(maxsize=64)
+def _list_file_names(dir_str: str, mtime_ns: int) -> tuple[str, ...]:
+    """Case-insensitively sorted names of the regular files in a directory.
+
+    Keyed on the directory's mtime, which changes whenever entries are
+    added, removed or renamed.
+    """
+
+    return tuple(
+        sorted(
+            (p.name for p in Path(dir_str).iterdir() if p.is_file()),
+            key=str.lower,
+        )
+    )
+
+
+def _file_names(source_dir: Path) -> tuple[str, ...]:
+    return _list_file_names(str(source_dir.resolve()), source_dir.stat().st_mtime_ns)
+
+
 def iter_audio_files(source_dir: Path) -> list[Path]:
-    files = [
-        p
-        for p in source_dir.iterdir()
-        if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS
+    return [
+        source_dir / name
+        for name in _file_names(source_dir)
+        if Path(name).suffix.lower() in AUDIO_EXTENSIONS
     ]
-    return sorted(files, key=lambda p: p.name.lower())
 
 
 def find_license_file(source_dir: Path) -> Path | None:
-    for item in sorted(source_dir.iterdir(), key=lambda p: p.name.lower()):
-        if item.is_file() and item.name.lower().startswith("license"):
-            return item
+    for name in _file_names(source_dir):
+        if name.lower().startswith("license"):
+            return source_dir / name
     return None
 
 
 def find_icon_file(source_dir: Path) -> Path | None:
-    for item in sorted(source_dir.iterdir(), key=lambda p: p.name.lower()):
-        if item.is_file() and item.suffix.lower() in IMAGE_EXTENSIONS:
-            return item
+    for name in _file_names(source_dir):
+        if Path(name).suffix.lower() in IMAGE_EXTENSIONS:
+            return source_dir / name
     return None
 
 
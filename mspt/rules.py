@@ -3,12 +3,14 @@ from __future__ import annotations
 import random
 import re
 from fnmatch import fnmatchcase
+from functools import lru_cache
+from itertools import product
 from pathlib import Path
 from typing import get_args
 
 from mspt.io_utils import read_json
+from mspt.keys import KeyName
 from mspt.models import SourceEntry
-from mspt.schema.mvdx import KeyName
 from mspt.sourcemap import iter_sourcemap_entries
 
 
@@ -38,50 +40,98 @@ def to_list(value) -> list[str]:
     return list(value)
 
 
+# KeyName is a fixed Literal; read its members once.
+_KEY_NAMES: tuple[str, ...] = get_args(KeyName)
+_KEY_SET: frozenset[str] = frozenset(_KEY_NAMES)
+_KEY_LOWER_SET: frozenset[str] = frozenset(key.lower() for key in _KEY_NAMES)
+
+# A key holds at most a down and an up timing pair.
+_MAX_TIMINGS = 2
+
+_BRACE_RANGE_RE = re.compile(r"\{(\d+)-(\d+)\}")
+_REGEX_META_RE = re.compile(r"[.^$*+?()\[\]{}|\\]")
+
+
+def _expand_brace_ranges(pattern: str) -> list[str]:
+    """Expand every `{a-b}` range in `pattern` (e.g. `2{0-1}` -> `20`, `21`)."""
+
+    matches = list(_BRACE_RANGE_RE.finditer(pattern))
+    if not matches:
+        return [pattern]
+
+    fragments: list[str] = []
+    ranges: list[range] = []
+    pos = 0
+    for match in matches:
+        fragments.append(pattern[pos : match.start()])
+        start, end = int(match.group(1)), int(match.group(2))
+        if start > end:
+            start, end = end, start
+        ranges.append(range(start, end + 1))
+        pos = match.end()
+    tail = pattern[pos:]
+
+    expanded: list[str] = []
+    for combo in product(*ranges):
+        item = "".join(f"{frag}{num}" for frag, num in zip(fragments, combo)) + tail
+        # Substituting a number can complete a new range (e.g. `{{1-2}-3}`).
+        if _BRACE_RANGE_RE.search(item):
+            expanded.extend(_expand_brace_ranges(item))
+        else:
+            expanded.append(item)
+    return expanded
+
+
+@lru_cache(maxsize=1024)
 def compile_matcher(pattern: str):
     """Build a case-insensitive matcher for filenames/keys.
 
+    Matchers are cached per pattern, so repeated rule patterns, selectors and
+    config patterns are only compiled (and brace-expanded) once. Results are
+    only meant to be tested for truthiness: regex patterns return the bound
+    `search` method, so a hit is an `re.Match` rather than `True`.
+
     Matching order:
     1) If pattern contains numeric brace ranges like `{0-3}`, expand into a list
        and match using glob for each expanded pattern.
     2) Else, try to compile as regex (re.IGNORECASE) and use `search()`.
+       Patterns without regex metacharacters (e.g. `Enter`) take a plain
+       substring fast path with the same result.
     3) If regex compilation fails, fall back to glob matching.
 
     **Example**
     - `m = compile_matcher("2{0-3}.wav")`
     - `m("20.wav") == True`, `m("24.wav") == False`
     """
-    brace_range = re.compile(r"\{(\d+)-(\d+)\}")
-    if brace_range.search(pattern):
-        expanded: list[str] = [pattern]
-        while True:
-            next_expanded: list[str] = []
-            did_expand = False
-            for item in expanded:
-                match = brace_range.search(item)
-                if not match:
-                    next_expanded.append(item)
-                    continue
-                did_expand = True
-                start = int(match.group(1))
-                end = int(match.group(2))
-                if start > end:
-                    start, end = end, start
-                for num in range(start, end + 1):
-                    next_expanded.append(
-                        item[: match.start()] + str(num) + item[match.end() :]
-                    )
-            expanded = next_expanded
-            if not did_expand:
-                break
+    if _BRACE_RANGE_RE.search(pattern):
+        expanded = _expand_brace_ranges(pattern)
+        lowered = tuple(p.lower() for p in expanded)
+
+        def match_expanded(text: str) -> bool:
+            text = text.lower()
+            return any(fnmatchcase(text, p) for p in lowered)
 
-        return lambda text: any(fnmatchcase(text.lower(), p.lower()) for p in expanded)
+        return match_expanded
+
+    if pattern.isascii() and not _REGEX_META_RE.search(pattern):
+        # A literal regex is a case-insensitive substring search; do that
+        # directly. Non-ASCII text keeps going through `re` so Unicode case
+        # folding stays exactly as before.
+        needle = pattern.lower()
+        literal = re.compile(re.escape(pattern), re.IGNORECASE)
+
+        def match_literal(text: str) -> bool:
+            if text.isascii():
+                return needle in text.lower()
+            return literal.search(text) is not None
+
+        return match_literal
 
     try:
-        regex = re.compile(pattern, re.IGNORECASE)
-        return lambda text: regex.search(text) is not None
+        return re.compile(pattern, re.IGNORECASE).search
     except re.error:
-        return lambda text: fnmatchcase(text.lower(), pattern.lower())
+        lowered_pattern = pattern.lower()
+        return lambda text: fnmatchcase(text.lower(), lowered_pattern)
 
 
 def load_key_names() -> list[str]:
@@ -90,7 +140,7 @@ def load_key_names() -> list[str]:
     **Input**: none.
     **Output**: a stable list of KeyName literal strings.
     """
-    return list(get_args(KeyName))
+    return list(_KEY_NAMES)
 
 
 def resolve_key_selectors(selectors: list[str], keys: list[str]) -> list[str]:
@@ -102,6 +152,9 @@ def resolve_key_selectors(selectors: list[str], keys: list[str]) -> list[str]:
       expanded to all matching keys (in `keys` order).
     - Duplicates are removed while preserving first occurrence order.
 
+    Results are cached per (selectors, keys), since many rules share the same
+    selector list.
+
     **Inputs**
     - `selectors`: e.g. `["Enter", "Numpad*"]`
     - `keys`: the full key name universe.
@@ -109,24 +162,47 @@ def resolve_key_selectors(selectors: list[str], keys: list[str]) -> list[str]:
     **Output**
     - Concrete key list.
     """
+    return list(_resolve_key_selectors_cached(tuple(selectors), tuple(keys)))
+
+
+@lru_cache(maxsize=512)
+def _resolve_key_selectors_cached(
+    selectors: tuple[str, ...], keys: tuple[str, ...]
+) -> tuple[str, ...]:
+    key_set = _KEY_SET if keys == _KEY_NAMES else frozenset(keys)
     resolved: list[str] = []
+    seen: set[str] = set()
     for selector in selectors:
-        if selector in keys:
-            resolved.append(selector)
-            continue
-        matcher = compile_matcher(selector)
-        matched = [key for key in keys if matcher(key)]
-        resolved.extend(matched)
-    return list(dict.fromkeys(resolved))
+        if selector in key_set:
+            candidates = (selector,)
+        else:
+            matcher = compile_matcher(selector)
+            candidates = [key for key in keys if matcher(key)]
+        for key in candidates:
+            if key not in seen:
+                seen.add(key)
+                resolved.append(key)
+    return tuple(resolved)
+
+
+@lru_cache(maxsize=8)
+def _load_rule_cached(path_str: str, mtime_ns: int) -> dict:
+    return read_json(Path(path_str))
 
 
 def load_rule(rule_path: Path | None) -> dict | None:
-    """Load a rule JSON/JSON5 file from disk."""
+    """Load a rule JSON/JSON5 file from disk.
+
+    Parsed rules are cached per (path, mtime), so an edited file is re-read.
+    The returned dict is shared between callers and must not be mutated.
+    """
     if rule_path is None:
         return None
-    if not rule_path.exists():
-        raise FileNotFoundError(f"rule file not found at {rule_path}")
-    return read_json(rule_path)
+    try:
+        mtime_ns = rule_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"rule file not found at {rule_path}") from None
+    return _load_rule_cached(str(rule_path), mtime_ns)
 
 
 def apply_rule_map(
@@ -156,31 +232,39 @@ def apply_rule_map(
     used_indices: set[int] = set()
     fallback_entry: SourceEntry | None = None
 
+    # Compile every rule up front; rules often share a selector list (e.g.
+    # several patterns mapped to ["Numpad*"]), which resolves from cache.
+    compiled_rules = []
     for pattern, selectors in rule_map.items():
         selector_list = to_list(selectors)
         has_fallback = "*" in selector_list
         if has_fallback:
             selector_list = [item for item in selector_list if item != "*"]
 
-        matcher = compile_matcher(pattern)
         target_keys = resolve_key_selectors(selector_list, keys)
-
-        for idx, entry in enumerate(entries):
-            if idx in used_indices:
-                continue
-            if not matcher(entry.file):
-                continue
-
+        compiled_rules.append((compile_matcher(pattern), target_keys, has_fallback))
+
+    # Entries not yet claimed by an earlier rule; each rule only scans these.
+    alive: dict[int, SourceEntry] = dict(enumerate(entries))
+    for matcher, target_keys, has_fallback in compiled_rules:
+        matched = [(idx, entry) for idx, entry in alive.items() if matcher(entry.file)]
+        for idx, entry in matched:
+            del alive[idx]
             used_indices.add(idx)
             if has_fallback and fallback_entry is None:
                 fallback_entry = entry
             if not target_keys:
                 continue
 
+            timing = entry.timing
             for key in target_keys:
-                if len(buckets[key]) >= 2:
-                    raise ValueError(f"Key '{key}' exceeds timing limit (max 2).")
-                buckets[key].extend(entry.timing)
+                bucket = buckets[key]
+                if len(bucket) + len(timing) > _MAX_TIMINGS:
+                    raise ValueError(
+                        f"Key '{key}' exceeds timing limit (max 2) "
+                        f"when adding '{entry.file}'."
+                    )
+                bucket.extend(timing)
 
     return buckets, used_indices, fallback_entry
 
@@ -201,11 +285,11 @@ def assign_direct_matches(
     """
     direct_map: dict[str, SourceEntry] = {}
     remaining_after_match: list[SourceEntry] = []
+    keys_by_lower: dict[str, str] = {}
+    for k in candidate_keys:
+        keys_by_lower.setdefault(k.lower(), k)
     for entry in remaining_entries:
-        matched_key = next(
-            (k for k in candidate_keys if k.lower() == entry.name.lower()),
-            None,
-        )
+        matched_key = keys_by_lower.get(entry.name_lower)
         if matched_key and matched_key not in direct_map:
             direct_map[matched_key] = entry
         else:
@@ -237,11 +321,7 @@ def assign_round_robin(
     - candidate_keys = ["A", "B"], remaining_entries = [e1, e2]
     - After call: buckets["A"] += e1.timing[:1], buckets["B"] += e2.timing[:1]
     """
-    available_keys = list(candidate_keys)
-    for entry in remaining_entries:
-        if not available_keys:
-            break
-        key = available_keys.pop(0)
+    for key, entry in zip(candidate_keys, remaining_entries):
         buckets[key].extend(entry.timing[:1])
 
 
@@ -250,6 +330,8 @@ def fill_empty_with_random(
     buckets: dict[str, list[tuple[float, float]]],
     entries: list[SourceEntry],
     rng: random.Random,
+    *,
+    reserved_names: frozenset[str] | None = None,
 ) -> None:
     """Fill any still-empty keys by random selection from existing entries.
 
@@ -258,6 +340,7 @@ def fill_empty_with_random(
     - `buckets`: existing assignments.
     - `entries`: all available entries.
     - `rng`: random source.
+    - `reserved_names`: lowered key names; derived from `keys` when omitted.
 
     **Output**
     - None.
@@ -269,18 +352,21 @@ def fill_empty_with_random(
       `enter.wav` don't get reused as generic samples unless there are no
       alternatives).
     """
-    reserved_names = {k.lower() for k in keys}
+    if reserved_names is None:
+        reserved_names = frozenset(k.lower() for k in keys)
     candidates = [
         entry
         for entry in entries
-        if entry.name and entry.name.lower() not in reserved_names
+        if entry.name and entry.name_lower not in reserved_names
     ]
     if not candidates:
         candidates = entries
-    for key in keys:
-        if not buckets[key]:
-            pick = rng.choice(candidates)
-            buckets[key].extend(pick.timing[:1])
+    empty_keys = [key for key in keys if not buckets[key]]
+    if not empty_keys:
+        return
+    picks = rng.choices(candidates, k=len(empty_keys))
+    for key, pick in zip(empty_keys, picks):
+        buckets[key].extend(pick.timing[:1])
 
 
 def build_definitions(sourcemap: dict, rule: dict | None) -> dict[str, dict]:
@@ -344,16 +430,17 @@ def build_definitions(sourcemap: dict, rule: dict | None) -> dict[str, dict]:
 
         # Reserve any entries whose name explicitly matches a key name, so they
         # don't get reused as generic samples unless a rule mapped them.
-        reserved_names = {k.lower() for k in keys}
         remaining_after_match = [
             entry
             for entry in remaining_after_match
-            if not entry.name or entry.name.lower() not in reserved_names
+            if not entry.name or entry.name_lower not in _KEY_LOWER_SET
         ]
 
         unassigned_keys = [key for key in keys if not buckets[key]]
         rng.shuffle(remaining_after_match)
         assign_round_robin(remaining_after_match, unassigned_keys, buckets)
-        fill_empty_with_random(keys, buckets, entries, rng)
+        fill_empty_with_random(
+            keys, buckets, entries, rng, reserved_names=_KEY_LOWER_SET
+        )
 
     return {key: {"timing": buckets[key]} for key in keys}
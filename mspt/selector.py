@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+# Kept free of heavy imports (pydantic, pydub) so the CLI can validate
+# arguments without loading them.
+
+
+def parse_schema_selector(selector: str) -> set[str]:
+    """Parse a schema selector string.
+
+    - "v1|v2" selects both
+    - "all" is a special value meaning "v1|v2|mvdx"
+    """
+
+    raw = (selector or "").strip().lower()
+    if not raw:
+        raise ValueError("schema selector is empty")
+    if raw == "all":
+        return {"v1", "v2", "mvdx"}
+    parts = [p.strip() for p in raw.split("|") if p.strip()]
+    allowed = {"v1", "v2", "mvdx"}
+    unknown = [p for p in parts if p not in allowed]
+    if unknown:
+        raise ValueError(
+            "Invalid --schema value(s): "
+            + ", ".join(sorted(set(unknown)))
+            + ". Use v1|v2|mvdx or all."
+        )
+    return set(parts)
@@ -1,11 +1,32 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from mspt.models import SourceEntry
 
 
+def _iter_entries_raw(sourcemap: dict) -> Iterator[SourceEntry]:
+    if isinstance(sourcemap.get("sounds"), list):
+        yield from (
+            SourceEntry(name, str(filename), [(float(timing[0]), float(timing[1]))])
+            for sound in sourcemap["sounds"]
+            for name in (str(sound.get("name", "")),)
+            for file_map in sound.get("files", []) or []
+            if isinstance(file_map, dict)
+            for filename, timing in file_map.items()
+            if filename and isinstance(timing, (list, tuple)) and len(timing) == 2
+        )
+        return
+
+    for item in sourcemap.get("files", []):
+        yield SourceEntry(
+            name=item.get("name", ""),
+            file=item.get("file", item.get("name", "")),
+            timing=[tuple(pair) for pair in item.get("timing", [])],
+        )
+
+
 def iter_sourcemap_entries(sourcemap: dict) -> list[SourceEntry]:
     """Normalize sourcemap into a flat list of SourceEntry.
 
@@ -19,45 +40,16 @@ def iter_sourcemap_entries(sourcemap: dict) -> list[SourceEntry]:
     - entry.timing: list of (startMs,endMs) pairs
     """
 
-    if isinstance(sourcemap.get("sounds"), list):
-        entries: list[SourceEntry] = []
-        for sound in sourcemap.get("sounds", []):
-            name = str(sound.get("name", ""))
-            for file_map in sound.get("files", []) or []:
-                if not isinstance(file_map, dict):
-                    continue
-                for filename, timing in file_map.items():
-                    if not filename:
-                        continue
-                    if not isinstance(timing, (list, tuple)) or len(timing) != 2:
-                        continue
-                    start, end = float(timing[0]), float(timing[1])
-                    entries.append(
-                        SourceEntry(
-                            name=name, file=str(filename), timing=[(start, end)]
-                        )
-                    )
-        return entries
-
-    files = sourcemap.get("files", [])
-    entries = [
-        SourceEntry(
-            name=item.get("name", ""),
-            file=item.get("file", item.get("name", "")),
-            timing=[tuple(pair) for pair in item.get("timing", [])],
-        )
-        for item in files
-    ]
-    return entries
+    return list(_iter_entries_raw(sourcemap))
 
 
 def list_sourcemap_filenames(sourcemap: dict) -> list[str]:
     """Return all concrete filenames referenced by sourcemap (deduped, stable)."""
-    seen: dict[str, None] = {}
-    for entry in iter_sourcemap_entries(sourcemap):
-        if entry.file:
-            seen.setdefault(entry.file, None)
-    return list(seen.keys())
+    return list(
+        dict.fromkeys(
+            entry.file for entry in _iter_entries_raw(sourcemap) if entry.file
+        )
+    )
 
 
 def resolve_source_dir(sourcemap: dict, *, target_dir: Path) -> Path:
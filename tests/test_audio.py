@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from mspt.audio import AudioProbe, _has_exact_uniform_format
+
+
+def _flac(bits: int, sample_fmt: str) -> AudioProbe:
+    return AudioProbe(
+        codec="flac",
+        sample_rate=44100,
+        channels=2,
+        sample_fmt=sample_fmt,
+        bits_per_raw_sample=bits,
+        duration_ms=100.0,
+    )
+
+
+def test_uniform_format_rejects_mixed_bit_depth() -> None:
+    assert _has_exact_uniform_format([_flac(16, "s16"), _flac(16, "s16")])
+    assert not _has_exact_uniform_format([_flac(16, "s16"), _flac(24, "s32")])
+    # Same sample format, different raw depth (24-bit audio in s32).
+    assert not _has_exact_uniform_format([_flac(32, "s32"), _flac(24, "s32")])
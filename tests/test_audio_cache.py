@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import wave
+from pathlib import Path
+
+from mspt.audio_cache import CACHE_DIR_NAME, cache_key, load_pcm
+
+
+def _write_wav(path: Path, frames: bytes) -> None:
+    with wave.open(str(path), "wb") as fp:
+        fp.setnchannels(1)
+        fp.setsampwidth(2)
+        fp.setframerate(8000)
+        fp.writeframes(frames)
+
+
+def test_load_pcm_treats_corrupt_metadata_as_miss(tmp_path: Path) -> None:
+    src = tmp_path / "a.wav"
+    _write_wav(src, b"\x01\x00" * 80)
+    first = load_pcm(src)
+
+    meta = tmp_path / CACHE_DIR_NAME / f"{cache_key(src)}.json"
+    meta.write_text("", encoding="utf-8")
+    again = load_pcm(src)
+    assert bytes(again.data) == bytes(first.data)
+
+
+def test_load_pcm_prunes_stale_entries(tmp_path: Path) -> None:
+    src = tmp_path / "a.wav"
+    _write_wav(src, b"\x01\x00" * 80)
+    load_pcm(src)
+    old_key = cache_key(src)
+
+    _write_wav(src, b"\x02\x00" * 160)
+    load_pcm(src)
+    names = sorted(p.name for p in (tmp_path / CACHE_DIR_NAME).iterdir())
+    new_key = cache_key(src)
+    assert new_key != old_key
+    assert names == [f"{new_key}.json", f"{new_key}.pcm"]
@@ -4,7 +4,14 @@ from typing import cast
 
 import pytest
 
-from mspt.converters import build_mechvibes_v2_inputs, to_mechvibes_v1, to_mechvibes_v2
+from mspt.converters import (
+    _first_match_indices,
+    _with_suffix,
+    build_mechvibes_v2_inputs,
+    to_mechvibes_v1,
+    to_mechvibes_v2,
+)
+from mspt.rules import compile_matcher
 from mspt.schema.mvdx import DefinitionKey, KeyName, MVDXSchema
 
 
@@ -112,3 +119,58 @@ def test_mechvibes_v2_split_derives_up_from_down() -> None:
     # Enter down uses its own file, so Enter up should follow it.
     assert inputs.keydown_defines["Enter"] == "1.wav"
     assert inputs.keyup_defines["Enter"] == "1-up.wav"
+
+
+@pytest.mark.parametrize(
+    "patterns",
+    [
+        # Overlapping patterns: the first rule wins, not the longest match.
+        ["1.wav", "1", "wav", "a|b"],
+        # Brace ranges are globs and force the per-pattern fallback.
+        ["{0-3}.wav", "1", "x"],
+        # Inline flags and non-capturing groups.
+        ["(?:ta)b", "(?i)ENTER", "e"],
+        # A capturing group inside a combined alternative.
+        ["(a|b)\\.wav", "a", "1"],
+        # A backreference, whose numbering would shift if combined.
+        ["(a)\\1", "a"],
+        # Invalid regex, matched as a glob.
+        ["[", "1*"],
+        ["ENTER", "Tab"],
+    ],
+)
+def test_first_match_indices_matches_per_pattern_loop(patterns: list[str]) -> None:
+    files = ["1.wav", "11.wav", "2.wav", "5.wav", "a.wav", "b.wav", "aa", "ab"]
+    files += ["Enter.wav", "tab.wav", "x.ogg", "[", "none"]
+    matchers = [compile_matcher(p) for p in patterns]
+    expected = [
+        next((i for i, matcher in enumerate(matchers) if matcher(f)), None)
+        for f in files
+    ]
+    assert _first_match_indices(patterns, files) == expected
+
+
+@pytest.mark.parametrize(
+    ("name", "up", "down"),
+    [
+        ("1.ogg", "1-up.ogg", "1-down.ogg"),
+        ("1-up.ogg", "1-up.ogg", "1-up-down.ogg"),
+        ("1-down.wav", "1-down-up.wav", "1-down.wav"),
+        # Dotless names and patterns.
+        ("1", "1-up", "1-down"),
+        ("1-up", "1-up-up", "1-up-down"),
+        # Only the last dot starts the extension.
+        ("a.b.ogg", "a.b-up.ogg", "a.b-down.ogg"),
+        ("{0-3}.wav", "{0-3}-up.wav", "{0-3}-down.wav"),
+        # Upper-case extensions get the suffix inserted, but are never
+        # treated as already suffixed.
+        ("1.OGG", "1-up.OGG", "1-down.OGG"),
+        ("1-up.OGG", "1-up-up.OGG", "1-up-down.OGG"),
+        ("1-up.mp3", "1-up-up.mp3", "1-up-down.mp3"),
+        (".ogg", "-up.ogg", "-down.ogg"),
+        ("", "", ""),
+    ],
+)
+def test_with_suffix(name: str, up: str, down: str) -> None:
+    assert _with_suffix(name, "-up") == up
+    assert _with_suffix(name, "-down") == down
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import copy
+from pathlib import Path
+
+from mspt.io_utils import deep_merge, link_or_copy, read_json, write_json
+
+
+def test_link_or_copy_replaces_existing_target(tmp_path: Path) -> None:
+    src = tmp_path / "icon.png"
+    src.write_bytes(b"new")
+    dst = tmp_path / "target" / "icon.png"
+    dst.parent.mkdir()
+    dst.write_bytes(b"old")
+
+    link_or_copy(src, dst)
+    assert dst.read_bytes() == b"new"
+
+    # Running the build again over the same target is a no-op.
+    link_or_copy(src, dst)
+    assert dst.read_bytes() == b"new"
+
+
+def test_write_json_compact_round_trips(tmp_path: Path) -> None:
+    p = tmp_path / "config.json"
+    data = {"name": "键盘", "defines": {"28": "enter.wav"}}
+    write_json(p, data, compact=True)
+    assert b"\n" not in p.read_bytes()
+    assert read_json(p) == data
+
+
+def test_deep_merge_merges_nested_and_leaves_inputs_alone() -> None:
+    base = {"name": "a", "options": {"volume": 1.0, "pitch": False}, "tags": ["x"]}
+    override = {"options": {"pitch": True}, "tags": ["y"], "icon": "i.png"}
+    base_before = copy.deepcopy(base)
+    override_before = copy.deepcopy(override)
+
+    merged = deep_merge(base, override)
+
+    assert merged == {
+        "name": "a",
+        "options": {"volume": 1.0, "pitch": True},
+        "tags": ["y"],
+        "icon": "i.png",
+    }
+    assert base == base_before
+    assert override == override_before
+
+
+def test_deep_merge_overlay_replaces_non_dict_values() -> None:
+    assert deep_merge({"a": {"b": 1}}, {"a": 2}) == {"a": 2}
+    assert deep_merge({"a": 1}, {"a": {"b": 2}}) == {"a": {"b": 2}}
+    assert deep_merge({"a": 1}, {"a": None}) == {"a": None}
+    # Nothing to change: the base is returned as-is.
+    base = {"a": {"b": 1}}
+    assert deep_merge(base, {"a": {"b": 1}}) is base
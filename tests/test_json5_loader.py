@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import sys
 from pathlib import Path
 
-from mspt.io_utils import read_json
+import pytest
+
+from mspt.io_utils import _strip_json5, read_json, read_json_str
 
 
 def test_read_json_supports_line_comments(tmp_path: Path) -> None:
@@ -15,11 +18,37 @@ def test_read_json_supports_line_comments(tmp_path: Path) -> None:
     assert data["map"]["1.wav"] == ["Enter"]
 
 
-def test_read_json_supports_block_comments(tmp_path: Path) -> None:
-    p = tmp_path / "rule.json"
-    p.write_text(
-        '{\n  /* block */\n  "map": {"1.wav": ["Enter"]}\n}\n',
-        encoding="utf-8",
-    )
-    data = read_json(p)
+def test_read_json_str_supports_block_comments() -> None:
+    data = read_json_str('{\n  /* block */\n  "map": {"1.wav": ["Enter"]}\n}\n')
     assert data["map"]["1.wav"] == ["Enter"]
+
+
+def test_read_json_str_keeps_comment_markers_in_strings() -> None:
+    data = read_json_str('{"url": "http://a/*b*/", "map": {"1.wav": ["Enter"],},}')
+    assert data == {"url": "http://a/*b*/", "map": {"1.wav": ["Enter"]}}
+
+
+@pytest.fixture
+def no_json5(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Force the built-in comment / trailing comma stripper.
+    monkeypatch.setitem(sys.modules, "json5", None)
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ('{"a": "// not a comment", "b": 1,}', {"a": "// not a comment", "b": 1}),
+        ('{"url": "http://x/y", // note\n "n": 2,}', {"url": "http://x/y", "n": 2}),
+        (
+            '{"q": "say \\"/* hi */\\"", /* gone */ "n": [1, 2,],}',
+            {"q": 'say "/* hi */"', "n": [1, 2]},
+        ),
+        ('{/* a\n multi-line\n block */ "k": "v"}', {"k": "v"}),
+    ],
+)
+def test_strip_json5_without_json5(no_json5: None, text: str, expected) -> None:
+    assert read_json_str(text) == expected
+
+
+def test_strip_json5_keeps_single_quoted_strings() -> None:
+    assert _strip_json5("{'a // b': 1, /* c */}") == "{'a // b': 1 }"
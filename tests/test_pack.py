@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+from pydub import AudioSegment
+
+from mspt.pack import _clipper, _is_derived_variant, pack_target
+
+
+@pytest.mark.parametrize(
+    ("sample_width", "frame_rate", "channels"),
+    [(1, 8000, 1), (2, 44100, 2), (2, 22050, 1), (4, 48000, 2), (2, 11025, 2)],
+)
+def test_clip_matches_pydub_slicing(
+    sample_width: int, frame_rate: int, channels: int
+) -> None:
+    frames = frame_rate // 10 + 7  # ~100 ms plus a partial millisecond
+    segment = AudioSegment(
+        data=os.urandom(frames * sample_width * channels),
+        sample_width=sample_width,
+        frame_rate=frame_rate,
+        channels=channels,
+    )
+    length = len(segment)
+    clip = _clipper(segment)
+    offsets = [0, 1, 3, 50, length - 1, length, length + 1, length + 50]
+    for start in offsets:
+        for end in offsets:
+            assert clip(start, end) == segment[start:end].raw_data, (start, end)
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("X-up.ogg", ("X.ogg", "up")),
+        ("X-down.ogg", ("X.ogg", "down")),
+        # Names without an extension.
+        ("X-up", ("X", "up")),
+        ("X-down", ("X", "down")),
+        (".X-up", (".X", "up")),
+        ("X-up.", None),
+        # Only the last dot starts the extension.
+        ("a.b-up.ogg", ("a.b.ogg", "up")),
+        ("a.b.c-down.wav", ("a.b.c.wav", "down")),
+        ("X-up.tar.gz", None),
+        # Extensions keep their case; the variant marker does not fold case.
+        ("X-up.OGG", ("X.OGG", "up")),
+        ("X-UP.ogg", None),
+        # Like Path.stem, only the final path component is considered.
+        ("dir/X-up.wav", ("X.wav", "up")),
+        ("-up.ogg", (".ogg", "up")),
+        ("plain.ogg", None),
+        ("plain", None),
+    ],
+)
+def test_is_derived_variant(name: str, expected: tuple[str, str] | None) -> None:
+    assert _is_derived_variant(name) == expected
+
+
+def test_pack_target_stores_compressed_audio_and_skips_build_files(
+    tmp_path: Path,
+) -> None:
+    target = tmp_path / "demo"
+    (target / "sub").mkdir(parents=True)
+    files = {
+        "sound.ogg": os.urandom(256),
+        "extra.mp3": os.urandom(256),
+        "icon.png": b"png" * 50,
+        "license.txt": b"MIT\n" * 20,
+        "sub/x.wav": b"\0" * 512,
+    }
+    for name, data in files.items():
+        (target / name).write_bytes(data)
+    variant = b'{"version": 1}'
+    (target / "config.v1.json").write_bytes(variant)
+    # Build-only files that must not ship.
+    (target / "sourcemap.json").write_bytes(b"{}")
+    (target / "config.json").write_bytes(b"{}")
+
+    zip_path = pack_target(target, config_variant="v1")
+
+    with zipfile.ZipFile(zip_path) as archive:
+        infos = {info.filename: info for info in archive.infolist()}
+        assert sorted(infos) == sorted(
+            [f"demo/{name}" for name in files] + ["demo/config.json"]
+        )
+        for name, data in files.items():
+            assert archive.read(f"demo/{name}") == data
+        assert archive.read("demo/config.json") == variant
+
+    stored = {"demo/sound.ogg", "demo/extra.mp3"}
+    for name, info in infos.items():
+        expected = zipfile.ZIP_STORED if name in stored else zipfile.ZIP_DEFLATED
+        assert info.compress_type == expected, name
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from mspt.paths import find_icon_file, find_license_file, iter_audio_files
+
+
+def test_listing_refreshes_when_directory_mtime_changes(tmp_path: Path) -> None:
+    (tmp_path / "a.wav").write_bytes(b"")
+    os.utime(tmp_path, ns=(1_000_000_000, 1_000_000_000))
+    assert iter_audio_files(tmp_path) == [tmp_path / "a.wav"]
+
+    (tmp_path / "B.ogg").write_bytes(b"")
+    os.utime(tmp_path, ns=(2_000_000_000, 2_000_000_000))
+    assert iter_audio_files(tmp_path) == [tmp_path / "a.wav", tmp_path / "B.ogg"]
+
+
+def test_license_and_icon_match_case_insensitively(tmp_path: Path) -> None:
+    for name in ("1.WAV", "LICENSE.txt", "Icon.PNG", "notes.md"):
+        (tmp_path / name).write_bytes(b"")
+    assert find_license_file(tmp_path) == tmp_path / "LICENSE.txt"
+    assert find_icon_file(tmp_path) == tmp_path / "Icon.PNG"
+    assert iter_audio_files(tmp_path) == [tmp_path / "1.WAV"]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pytest
+
+from mspt.models import SourceEntry
+from mspt.rules import apply_rule_map
+
+
+def test_apply_rule_map_rejects_more_than_two_timings() -> None:
+    entries = [
+        SourceEntry("a", "a.wav", [(0.0, 10.0)]),
+        SourceEntry("b", "b.wav", [(10.0, 20.0), (20.0, 30.0)]),
+    ]
+    with pytest.raises(ValueError, match=r"'Enter'.*'b\.wav'"):
+        apply_rule_map(entries, ["Enter"], {"a.wav": "Enter", "b.wav": "Enter"})
+
+
+def test_apply_rule_map_accepts_down_and_up_pair() -> None:
+    entries = [
+        SourceEntry("a", "a.wav", [(0.0, 10.0)]),
+        SourceEntry("b", "b.wav", [(10.0, 20.0)]),
+    ]
+    buckets, used, _ = apply_rule_map(
+        entries, ["Enter"], {"a.wav": "Enter", "b.wav": "Enter"}
+    )
+    assert buckets["Enter"] == [(0.0, 10.0), (10.0, 20.0)]
+    assert used == {0, 1}